@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from .database import MARTS_SCHEMA, fetch_scalar, rollback
+
+# Report responses are cached per (pipeline version, path, query string). The dbt run
+# bumps the pipeline version (see medical_warehouse/macros/bump_pipeline_version.sql),
+# which retires every cached entry and ETag at once. API_CACHE_TTL=0 keeps entries until then.
+API_CACHE_TTL = int(os.getenv('API_CACHE_TTL', '3600'))
+# API_CACHE_ENABLED=0 turns the response cache off (benchmarks and load tests), so every request runs its query
+API_CACHE_ENABLED = os.getenv('API_CACHE_ENABLED', '1') == '1'
+API_CACHE_MAX_ENTRIES = int(os.getenv('API_CACHE_MAX_ENTRIES', '512'))
+# Optional shared backend for multi-worker deployments, e.g. redis://localhost:6379/0
+API_CACHE_REDIS_URL = os.getenv('API_CACHE_REDIS_URL')
+# How long clients may reuse a response before revalidating with If-None-Match
+API_CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', '60'))
+# Seconds between pipeline version lookups
+PIPELINE_VERSION_CHECK_INTERVAL = float(os.getenv('PIPELINE_VERSION_CHECK_INTERVAL', '5'))
+
+class MemoryCache:
+    """Thread-safe in-process cache with a per-entry TTL and least-recently-used eviction."""
+
+    def __init__(self, max_entries=API_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            expires_at = time.monotonic() + ttl if ttl else float('inf')
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+class RedisCache:
+    """Cache shared by all API workers, in any Redis-compatible server."""
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(f"api-cache:{key}")
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        # SETEX rejects 0; without an expiry the entry lives until the version changes
+        if ttl:
+            self.client.setex(f"api-cache:{key}", ttl, json.dumps(value))
+        else:
+            self.client.set(f"api-cache:{key}", json.dumps(value))
+
+def create_backend():
+    if API_CACHE_REDIS_URL:
+        try:
+            return RedisCache(API_CACHE_REDIS_URL)
+        except ImportError:
+            logging.warning("API_CACHE_REDIS_URL is set but the redis package is not installed; using the in-process cache.")
+    return MemoryCache()
+
+backend = create_backend()
+_version = {'value': 0, 'checked_at': float('-inf')}
+_version_lock = threading.Lock()
+
+async def pipeline_version(db):
+    """Latest version stamped by the dbt run, looked up at most every PIPELINE_VERSION_CHECK_INTERVAL seconds."""
+    with _version_lock:
+        if time.monotonic() - _version['checked_at'] < PIPELINE_VERSION_CHECK_INTERVAL:
+            return _version['value']
+    try:
+        version = await fetch_scalar(db, text(f"SELECT max(version) FROM {MARTS_SCHEMA}.pipeline_version")) or 0
+    except Exception:
+        # dbt hasn't run yet: every response shares version 0 until it does
+        await rollback(db)
+        version = 0
+    with _version_lock:
+        _version.update(value=version, checked_at=time.monotonic())
+    return version
+
+async def cached_response(request: Request, response: Response, db, compute):
+    """
+    Returns the awaited compute()'s JSON-ready result from the cache when possible, with ETag and
+    Cache-Control headers; a matching If-None-Match gets a 304 without touching the data.
+    """
+    version = await pipeline_version(db)
+    params = '&'.join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    key = f"{version}:{request.url.path}?{params}"
+    headers = {
+        'ETag': f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"',
+        'Cache-Control': f"public, max-age={API_CACHE_MAX_AGE}",
+    }
+    if headers['ETag'] in (tag.strip() for tag in request.headers.get('if-none-match', '').split(',')):
+        return Response(status_code=304, headers=headers)
+
+    body = backend.get(key) if API_CACHE_ENABLED else None
+    headers['X-Cache'] = 'HIT' if body is not None else 'MISS'
+    if body is None:
+        body = jsonable_encoder(await compute())
+        if API_CACHE_ENABLED:
+            backend.set(key, body, API_CACHE_TTL)
+    response.headers.update(headers)
+    return body
@@ -1,26 +1,130 @@
 import os
 from sqlalchemy import create_engine, MetaData
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+from src.db import database_url
 
 load_dotenv()
 
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5433')
-DB_NAME = os.getenv('DB_NAME', 'medical_db')
-DB_USER = os.getenv('DB_USER', 'sa')
-DB_PASS = os.getenv('DB_PASS', '123')
+# Schema the dbt marts are built in (the dbt profile's target schema)
+MARTS_SCHEMA = os.getenv('MARTS_SCHEMA', 'public')
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# API_DB_ASYNC=1 serves queries through asyncpg on the event loop; otherwise psycopg2
+# sessions run in the threadpool. Pool settings apply to whichever engine is used.
+API_DB_ASYNC = os.getenv('API_DB_ASYNC', '0') == '1'
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') == '1'
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Same credentials as the pipeline (src/db.py)
+DATABASE_URL = database_url('postgresql')
+ASYNC_DATABASE_URL = database_url('postgresql+asyncpg')
+
+# Engines are created on startup (see init_engine) and disposed on shutdown
+engine = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def pool_options():
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+def init_engine(use_async=API_DB_ASYNC):
+    global engine
+    if engine is None:
+        if use_async:
+            engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options())
+            AsyncSessionLocal.configure(bind=engine)
+        else:
+            engine = create_engine(DATABASE_URL, **pool_options())
+            SessionLocal.configure(bind=engine)
+    return engine
+
+async def dispose_engine():
+    global engine
+    if engine is None:
+        return
+    if isinstance(engine, AsyncEngine):
+        await engine.dispose()
+    else:
+        engine.dispose()
+    engine = None
+
+async def get_db():
+    init_engine()
+    if API_DB_ASYNC:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def fetch_all(db, query, params=None):
+    """Runs a query on either session type without blocking the event loop."""
+    if isinstance(db, AsyncSession):
+        result = await db.execute(query, params or {})
+        return result.fetchall()
+    return await run_in_threadpool(lambda: db.execute(query, params or {}).fetchall())
+
+async def fetch_scalar(db, query, params=None):
+    if isinstance(db, AsyncSession):
+        return (await db.execute(query, params or {})).scalar()
+    return await run_in_threadpool(lambda: db.execute(query, params or {}).scalar())
+
+async def rollback(db):
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
+
+async def open_stream(query, params=None, chunk_rows=1000):
+    """
+    Runs a query on a session of its own through a server-side cursor (a psycopg2 named
+    cursor, or an asyncpg cursor) and returns an iterator of row chunks: async for the
+    asyncpg engine, sync otherwise. Errors in the query raise here, before a response
+    starts; the session closes when the iterator ends or is closed.
+    """
+    if isinstance(init_engine(), AsyncEngine):
+        session = AsyncSessionLocal()
+        try:
+            result = await session.stream(query, params or {}, execution_options={'yield_per': chunk_rows})
+        except Exception:
+            await session.close()
+            raise
+
+        async def async_chunks():
+            try:
+                async for rows in result.partitions(chunk_rows):
+                    yield rows
+            finally:
+                await session.close()
+        return async_chunks()
+
+    session = SessionLocal()
+    streamed = query.execution_options(stream_results=True, yield_per=chunk_rows)
     try:
-        yield db
-    finally:
-        db.close()
+        result = await run_in_threadpool(lambda: session.execute(streamed, params or {}))
+    except Exception:
+        session.close()
+        raise
+
+    def chunks():
+        try:
+            yield from result.partitions(chunk_rows)
+        finally:
+            session.close()
+    return chunks()
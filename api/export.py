@@ -0,0 +1,190 @@
+import os
+import io
+import csv
+import json
+import importlib.util
+from sqlalchemy import text
+from .database import MARTS_SCHEMA
+
+# Rows fetched from the server-side cursor, and encoded, per chunk of the response
+EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '5000'))
+
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+EXTENSIONS = {'ndjson': 'ndjson', 'csv': 'csv', 'arrow': 'arrows'}
+
+# Exported columns and their kinds, in SELECT order. JSON columns are selected as text so
+# both database drivers return the same thing.
+COLUMNS = {
+    'messages': [
+        ('message_pk', 'int'), ('message_id', 'int'), ('channel_name', 'text'), ('message_timestamp', 'timestamp'),
+        ('message_text', 'text'), ('message_length', 'int'), ('view_count', 'int'), ('forward_count', 'int'),
+        ('has_image', 'bool'),
+    ],
+    'image-detections': [
+        ('detection_id', 'int'), ('message_id', 'int'), ('channel_name', 'text'), ('date_key', 'int'),
+        ('image_path', 'text'), ('primary_class', 'text'), ('confidence_score', 'float'),
+        ('image_category', 'text'), ('view_count', 'int'), ('object_count', 'int'),
+        ('detected_objects', 'json'), ('detection_date', 'timestamp'),
+    ],
+}
+
+def arrow_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+def export_query(dataset, channel=None, date_from=None, date_to=None, category=None):
+    """
+    Returns (query, params) selecting a mart in primary key order. The channel filter
+    uses dim_channels and the date filters use date_key, so both use indexes. For
+    messages, `category` keeps those whose image was detected in that category.
+    """
+    filters, params = [], {}
+    if date_from:
+        filters.append("t.date_key >= :date_from")
+        params["date_from"] = int(date_from.strftime('%Y%m%d'))
+    if date_to:
+        filters.append("t.date_key <= :date_to")
+        params["date_to"] = int(date_to.strftime('%Y%m%d'))
+    if channel:
+        filters.append("c.channel_name = :channel")
+        params["channel"] = channel
+
+    if dataset == 'messages':
+        if category:
+            filters.append(f"""EXISTS (
+                SELECT 1 FROM {MARTS_SCHEMA}.fct_image_detections d
+                WHERE d.channel_key = t.channel_key AND d.message_id = t.message_id
+                  AND d.image_category = :category
+            )""")
+            params["category"] = category
+        select = f"""
+            SELECT t.message_pk, t.message_id, c.channel_name, t.message_timestamp, t.message_text,
+                   t.message_length, t.view_count, t.forward_count, t.has_image
+            FROM {MARTS_SCHEMA}.fct_messages t
+            JOIN {MARTS_SCHEMA}.dim_channels c ON c.channel_key = t.channel_key
+        """
+        order = "t.message_pk"
+    else:
+        if category:
+            filters.append("t.image_category = :category")
+            params["category"] = category
+        select = f"""
+            SELECT t.detection_id, t.message_id, c.channel_name, t.date_key, t.image_path, t.primary_class,
+                   t.confidence_score, t.image_category, t.view_count, t.object_count,
+                   t.detected_objects::TEXT, t.detection_date
+            FROM {MARTS_SCHEMA}.fct_image_detections t
+            JOIN {MARTS_SCHEMA}.dim_channels c ON c.channel_key = t.channel_key
+        """
+        order = "t.detection_id"
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    return text(f"{select} {where} ORDER BY {order}"), params
+
+def _plain(value, kind):
+    if value is None:
+        return None
+    if kind == 'timestamp':
+        return value.isoformat()
+    return value
+
+class NdjsonEncoder:
+    """One JSON object per line; JSON columns are nested rather than quoted."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def start(self):
+        return b''
+
+    def encode(self, rows):
+        lines = []
+        for row in rows:
+            record = {
+                name: json.loads(value) if kind == 'json' and value is not None else _plain(value, kind)
+                for (name, kind), value in zip(self.columns, row)
+            }
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return ('\n'.join(lines) + '\n').encode() if lines else b''
+
+    def finish(self):
+        return b''
+
+class CsvEncoder:
+    """A header row, then the rows; timestamps in ISO 8601, JSON columns as JSON text."""
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def _write(self, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue().encode()
+
+    def start(self):
+        return self._write([[name for name, _ in self.columns]])
+
+    def encode(self, rows):
+        return self._write([
+            [_plain(value, kind) for (_, kind), value in zip(self.columns, row)] for row in rows
+        ])
+
+    def finish(self):
+        return b''
+
+class ArrowEncoder:
+    """Arrow IPC stream: the schema, one record batch per chunk, then the end-of-stream marker."""
+
+    def __init__(self, columns):
+        import pyarrow as pa
+        self.pa = pa
+        types = {'int': pa.int64(), 'float': pa.float64(), 'text': pa.string(), 'json': pa.string(),
+                 'bool': pa.bool_(), 'timestamp': pa.timestamp('us')}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.buffer = io.BytesIO()
+        self.writer = None
+
+    def _drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def start(self):
+        self.writer = self.pa.ipc.new_stream(self.buffer, self.schema)
+        return self._drain()
+
+    def encode(self, rows):
+        arrays = [
+            self.pa.array([row[i] for row in rows], type=field.type)
+            for i, field in enumerate(self.schema)
+        ]
+        self.writer.write_batch(self.pa.record_batch(arrays, schema=self.schema))
+        return self._drain()
+
+    def finish(self):
+        self.writer.close()
+        return self._drain()
+
+ENCODERS = {'ndjson': NdjsonEncoder, 'csv': CsvEncoder, 'arrow': ArrowEncoder}
+
+def stream_body(chunks, encoder):
+    """
+    Encodes row chunks from open_stream() as they arrive, so only one chunk is held in
+    memory however many rows the export has.
+    """
+    if hasattr(chunks, '__aiter__'):
+        async def async_body():
+            yield encoder.start()
+            async for rows in chunks:
+                yield encoder.encode(rows)
+            yield encoder.finish()
+        return async_body()
+
+    def body():
+        yield encoder.start()
+        for rows in chunks:
+            yield encoder.encode(rows)
+        yield encoder.finish()
+    return body()
@@ -1,107 +1,253 @@
-from fastapi import FastAPI, Depends, HTTPException, Query
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Path, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List
-from .database import get_db
+from typing import List, Optional
+from datetime import date
+from .database import get_db, init_engine, dispose_engine, fetch_all, open_stream, MARTS_SCHEMA
+from .cache import cached_response
+from . import export
 from .schemas import TopProduct, ChannelActivity, MessageSearch, VisualContentStats
+from src import instrumentation
+
+# Relevance ranking is computed over at most this many of the newest matches, so very
+# common terms cost the same as rare ones
+SEARCH_RANK_CANDIDATES = int(os.getenv('SEARCH_RANK_CANDIDATES', '5000'))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One engine (and connection pool) per process, closed cleanly on shutdown
+    init_engine()
+    yield
+    await dispose_engine()
 
 app = FastAPI(
     title="Ethiopian Medical Data Warehouse API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Medical Telegram Warehouse API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Pipeline stage metrics (see src/instrumentation.py) in the Prometheus text format."""
+    return PlainTextResponse(
+        instrumentation.render_prometheus(instrumentation.read_snapshot()),
+        media_type="text/plain; version=0.0.4"
+    )
+
 @app.get("/api/reports/top-products", response_model=List[TopProduct])
-def get_top_products(limit: int = 10, db: Session = Depends(get_db)):
+async def get_top_products(
+    request: Request,
+    response: Response,
+    limit: int = 10,
+    channel: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Returns the most frequently mentioned keywords (simple word count) from messages.
-    Focuses on words > 3 characters to avoid potential noise.
+    Returns the most frequently mentioned keywords, optionally for one channel and/or a
+    date range, from the precomputed fct_keyword_counts mart (stop words removed).
+    Cached until the next pipeline run.
     """
-    try:
-        query = text("""
-            SELECT lower(word) as keyword, count(*) as frequency
-            FROM (
-                SELECT unnest(string_to_array(message_text, ' ')) as word 
-                FROM raw.telegram_messages
-                WHERE message_text IS NOT NULL
-            ) t
-            WHERE length(word) > 3
-            GROUP BY lower(word)
-            ORDER BY frequency DESC
-            LIMIT :limit
-        """)
-        result = db.execute(query, {"limit": limit}).fetchall()
-        return [{"keyword": row[0], "frequency": row[1]} for row in result]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    filters, params = [], {"limit": limit}
+    if channel:
+        filters.append("channel_name = :channel")
+        params["channel"] = channel
+    if date_from:
+        filters.append("date_key >= :date_from")
+        params["date_from"] = int(date_from.strftime('%Y%m%d'))
+    if date_to:
+        filters.append("date_key <= :date_to")
+        params["date_to"] = int(date_to.strftime('%Y%m%d'))
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+    async def compute():
+        try:
+            query = text(f"""
+                SELECT keyword, SUM(mention_count) as frequency
+                FROM {MARTS_SCHEMA}.fct_keyword_counts
+                {where}
+                GROUP BY keyword
+                ORDER BY frequency DESC
+                LIMIT :limit
+            """)
+            result = await fetch_all(db, query, params)
+            return [{"keyword": row[0], "frequency": row[1]} for row in result]
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_response(request, response, db, compute)
 
 @app.get("/api/channels/{channel_name}/activity", response_model=List[ChannelActivity])
-def get_channel_activity(channel_name: str, db: Session = Depends(get_db)):
+async def get_channel_activity(channel_name: str, request: Request, response: Response, db: Session = Depends(get_db)):
     """
-    Returns specific activity stats for a given channel.
+    Returns specific activity stats for a given channel. Cached until the next pipeline run.
     """
-    query = text("""
-        SELECT 
-            channel_name, 
-            COUNT(*) as post_count, 
-            COALESCE(AVG(views), 0) as avg_views 
-        FROM raw.telegram_messages 
-        WHERE channel_name = :channel_name
-        GROUP BY channel_name
-    """)
-    result = db.execute(query, {"channel_name": channel_name}).fetchall()
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Channel not found")
+    async def compute():
+        query = text(f"""
+            SELECT channel_name, total_posts as post_count, COALESCE(avg_views, 0) as avg_views
+            FROM {MARTS_SCHEMA}.dim_channels
+            WHERE channel_name = :channel_name
+        """)
+        result = await fetch_all(db, query, {"channel_name": channel_name})
         
-    return [{"channel_name": row[0], "post_count": row[1], "avg_views": row[2]} for row in result]
+        if not result:
+            raise HTTPException(status_code=404, detail="Channel not found")
+            
+        return [{"channel_name": row[0], "post_count": row[1], "avg_views": row[2]} for row in result]
+
+    return await cached_response(request, response, db, compute)
+
+def is_undefined_function(error):
+    """True for Postgres' undefined_function (42883), e.g. `<%` or word_similarity without pg_trgm."""
+    # psycopg2 errors and SQLAlchemy's asyncpg adapter errors both expose the SQLSTATE as pgcode
+    return getattr(getattr(error, 'orig', None), 'pgcode', None) == '42883'
 
 @app.get("/api/search/messages", response_model=List[MessageSearch])
-def search_messages(query: str, limit: int = 20, db: Session = Depends(get_db)):
+async def search_messages(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    mode: str = Query("fts", pattern="^(fts|fuzzy)$"),
+    after_rank: Optional[float] = None,
+    after_id: Optional[int] = None,
+    response: Response = None,
+    db: Session = Depends(get_db)
+):
     """
-    Search for messages containing a keyword.
+    Search for messages matching a query, most relevant first.
+
+    mode=fts matches whole words (web-search syntax: "quoted phrases", OR, -exclude) via the
+    GIN index on fct_messages.search_vector; mode=fuzzy ranks by trigram word similarity, which tolerates
+    misspellings and partial words. Results are ranked among the newest SEARCH_RANK_CANDIDATES
+    matches only, so paging ends after that many; when older matches were left out the response
+    carries `X-Search-Truncated: true`. For the next page pass the last result's rank and id as
+    after_rank / after_id.
     """
-    sql_query = text("""
-        SELECT id, message_date, channel_name, message_text, views 
-        FROM raw.telegram_messages 
-        WHERE message_text ILIKE :query 
-        LIMIT :limit
+    if mode == "fts":
+        matches = f"""
+            SELECT message_pk AS id, message_timestamp, channel_key, message_text, view_count,
+                   ts_rank_cd(search_vector, q) AS rank
+            FROM {MARTS_SCHEMA}.fct_messages, websearch_to_tsquery('simple', :query) q
+            WHERE search_vector @@ q
+            ORDER BY message_pk DESC
+            LIMIT :candidates + 1
+        """
+    else:
+        matches = f"""
+            SELECT message_pk AS id, message_timestamp, channel_key, message_text, view_count,
+                   word_similarity(:query, message_text) AS rank
+            FROM {MARTS_SCHEMA}.fct_messages
+            WHERE :query <% message_text
+            ORDER BY message_pk DESC
+            LIMIT :candidates + 1
+        """
+    keyset = ""
+    if after_rank is not None and after_id is not None:
+        keyset = "WHERE (candidates.rank, candidates.id) < (CAST(:after_rank AS REAL), :after_id)"
+
+    # One candidate past the cap is fetched only to tell whether older matches were left out;
+    # the flag comes back even when the page itself is empty
+    sql_query = text(f"""
+        WITH matches AS ({matches}),
+        candidates AS (
+            SELECT * FROM matches ORDER BY id DESC LIMIT :candidates
+        ),
+        page AS (
+            SELECT candidates.id, candidates.message_timestamp, c.channel_name, candidates.message_text,
+                   candidates.view_count, candidates.rank
+            FROM candidates
+            JOIN {MARTS_SCHEMA}.dim_channels c ON c.channel_key = candidates.channel_key
+            {keyset}
+            ORDER BY candidates.rank DESC, candidates.id DESC
+            LIMIT :limit
+        )
+        SELECT page.*, (SELECT count(*) FROM matches) > :candidates AS truncated
+        FROM (SELECT 1) AS flag
+        LEFT JOIN page ON true
+        ORDER BY page.rank DESC, page.id DESC
     """)
-    result = db.execute(sql_query, {"query": f"%{query}%", "limit": limit}).fetchall()
-    
+    params = {
+        "query": query, "limit": limit, "candidates": SEARCH_RANK_CANDIDATES,
+        "after_rank": after_rank, "after_id": after_id
+    }
+    try:
+        result = await fetch_all(db, sql_query, params)
+    except Exception as e:
+        if mode == "fuzzy" and is_undefined_function(e):
+            raise HTTPException(status_code=501, detail="Fuzzy search needs the pg_trgm extension on the database.")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if response is not None and result and result[0][6]:
+        response.headers["X-Search-Truncated"] = "true"
     return [
         {
             "id": row[0], 
             "date": row[1], 
             "channel": row[2], 
             "text": row[3], 
-            "views": row[4]
-        } for row in result
+            "views": row[4],
+            "rank": row[5]
+        } for row in result if row[0] is not None
     ]
 
 @app.get("/api/reports/visual-content", response_model=List[VisualContentStats])
-def get_visual_content_stats(db: Session = Depends(get_db)):
+async def get_visual_content_stats(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Returns statistics on image content (Promotional vs Product vs Lifestyle)
-    and their average views.
+    and their average views. Cached until the next pipeline run.
     """
-    query = text("""
-        SELECT 
-            image_category as category,
-            COUNT(*) as count,
-            COALESCE(ROUND(AVG(m.views)), 0) as avg_views
-        FROM raw.yolo_detections d
-        JOIN raw.telegram_messages m ON d.message_id::TEXT = m.message_id::TEXT 
-            AND d.channel_name = m.channel_name
-        GROUP BY image_category
-        ORDER BY avg_views DESC
-    """)
-    result = db.execute(query).fetchall()
-    
-    return [
-        {"category": row[0], "count": row[1], "avg_views": row[2]} 
-        for row in result
-    ]
+    async def compute():
+        query = text(f"""
+            SELECT 
+                image_category as category,
+                COUNT(*) as count,
+                COALESCE(ROUND(AVG(view_count)), 0) as avg_views
+            FROM {MARTS_SCHEMA}.fct_image_detections
+            WHERE view_count IS NOT NULL
+            GROUP BY image_category
+            ORDER BY avg_views DESC
+        """)
+        result = await fetch_all(db, query)
+        
+        return [
+            {"category": row[0], "count": row[1], "avg_views": row[2]} 
+            for row in result
+        ]
+
+    return await cached_response(request, response, db, compute)
+
+@app.get("/api/export/{dataset}")
+async def export_dataset(
+    dataset: str = Path(..., pattern="^(messages|image-detections)$"),
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|arrow)$"),
+    channel: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    category: Optional[str] = None
+):
+    """
+    Streams fct_messages or fct_image_detections, optionally filtered by channel, date range
+    and image category, as NDJSON, CSV or Arrow IPC (format=arrow needs pyarrow). Rows are
+    read through a server-side cursor and sent EXPORT_CHUNK_ROWS at a time, so memory stays
+    flat however large the export.
+    """
+    if fmt == "arrow" and not export.arrow_available():
+        raise HTTPException(status_code=501, detail="Arrow export needs `pip install pyarrow` on the API server.")
+    query, params = export.export_query(dataset, channel, date_from, date_to, category)
+    try:
+        chunks = await open_stream(query, params, export.EXPORT_CHUNK_ROWS)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        export.stream_body(chunks, export.ENCODERS[fmt](export.COLUMNS[dataset])),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{export.EXTENSIONS[fmt]}"'}
+    )
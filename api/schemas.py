@@ -17,6 +17,7 @@ class MessageSearch(BaseModel):
     channel: str
     text: str
     views: Optional[int]
+    rank: Optional[float] = None
 
 class VisualContentStats(BaseModel):
     category: str
@@ -0,0 +1 @@
+"""Offline benchmark suite; run it with `python -m benchmarks.run` (see benchmarks/run.py)."""
@@ -0,0 +1,62 @@
+"""
+Compares two benchmark result files scenario by scenario:
+
+    python -m benchmarks.compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+
+API endpoints are compared on p50 latency, every other scenario on wall time; a change
+beyond --threshold percent is flagged as faster or slower.
+"""
+import sys
+import json
+import argparse
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def metric(entry):
+    """(metric name, value) a scenario is compared on, or None if it didn't complete."""
+    if entry.get('status') != 'ok':
+        return None
+    if 'p50_ms' in entry:
+        return 'p50_ms', entry['p50_ms']
+    return 'seconds', entry['seconds']
+
+def compare(before, after, threshold=10.0):
+    """Yields (scenario, metric, before, after, change %, verdict) for scenarios in either run."""
+    old = {entry['name']: entry for entry in before['scenarios']}
+    new = {entry['name']: entry for entry in after['scenarios']}
+    for name in list(old) + [name for name in new if name not in old]:
+        old_metric = metric(old[name]) if name in old else None
+        new_metric = metric(new[name]) if name in new else None
+        if old_metric is None or new_metric is None or old_metric[0] != new_metric[0]:
+            yield name, None, old_metric and old_metric[1], new_metric and new_metric[1], None, 'n/a'
+            continue
+        change = (new_metric[1] - old_metric[1]) / old_metric[1] * 100 if old_metric[1] else 0.0
+        verdict = 'slower' if change > threshold else 'faster' if change < -threshold else ''
+        yield name, old_metric[0], old_metric[1], new_metric[1], change, verdict
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10.0, help="Percent change to flag.")
+    args = parser.parse_args()
+
+    before, after = load_results(args.before), load_results(args.after)
+    if before.get('parameters') != after.get('parameters'):
+        print("Warning: the runs used different parameters; numbers may not be comparable.")
+    print(f"before: {before.get('commit')} ({before.get('started_at')})")
+    print(f"after:  {after.get('commit')} ({after.get('started_at')})\n")
+    print(f"{'scenario':<28} {'metric':>8} {'before':>10} {'after':>10} {'change':>8}")
+    regressions = 0
+    for name, unit, old, new, change, verdict in compare(before, after, args.threshold):
+        if change is None:
+            print(f"{name:<28} {'':>8} {str(old):>10} {str(new):>10} {'':>8}  {verdict}")
+            continue
+        regressions += verdict == 'slower'
+        print(f"{name:<28} {unit:>8} {old:>10.3f} {new:>10.3f} {change:>+7.1f}%  {verdict}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Deterministic synthetic Telegram data in the scraper's on-disk format.
+
+For N channels × M messages per channel it writes, under `out_dir`:
+
+    data/raw/telegram_messages/<date>/<channel>.jsonl   one message per line, as src/scraper.py writes them
+    data/raw/media/                                     content-addressed images + SQLite index (src/media_store.py)
+
+The same seed always produces byte-identical files, so benchmark runs on different
+commits process the same input:
+
+    python -m benchmarks.generator --out /tmp/medical_bench --channels 8 --messages 5000
+"""
+import os
+import io
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from PIL import Image, ImageDraw
+
+from src import media_store
+
+START_DATE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+PRODUCTS = ['Paracetamol 500mg', 'Amoxicillin 250mg', 'Vitamin C 1000mg', 'Ibuprofen 400mg', 'Metformin 850mg',
+            'Omeprazole 20mg', 'Cough Syrup 100ml', 'Sunscreen SPF50', 'Face Cream', 'Baby Lotion',
+            'Hand Sanitizer', 'Blood Pressure Monitor', 'Glucometer', 'Zinc Tablets', 'Multivitamin Syrup']
+PRODUCTS_AM = ['ፓራሲታሞል', 'አሞክሲሲሊን', 'ቫይታሚን ሲ', 'ኢቡፕሮፌን', 'የሳል ሽሮፕ', 'የፊት ክሬም', 'የሕፃናት ሎሽን']
+TEMPLATES = [
+    "{product} available now! Price: {price} birr. Call {phone}",
+    "✅ {product} {price} ብር ብቻ 📞 {phone}",
+    "{product_am} አለ። ዋጋ {price} ብር። ይደውሉ {phone}",
+    "New stock: {product} and {product2}. Delivery available in Addis Ababa 🚚",
+    "{product} - original, imported. {price} ETB #pharmacy #health",
+    "ቅናሽ! {product_am} እና {product} በ {price} ብር። አድራሻ: ቦሌ",
+    "Out of stock: {product}. Restocking next week.",
+    "{product_am} በጅምላ እና በችርቻሮ 📦 {phone}",
+]
+COLORS = [(230, 57, 70), (69, 123, 157), (29, 53, 87), (241, 250, 238), (168, 218, 220), (255, 183, 3),
+          (42, 157, 143), (233, 196, 106), (244, 162, 97), (38, 70, 83)]
+
+def channel_names(count):
+    return [f'bench_channel_{c}' for c in range(count)]
+
+def message_text(rng):
+    return rng.choice(TEMPLATES).format(
+        product=rng.choice(PRODUCTS), product2=rng.choice(PRODUCTS), product_am=rng.choice(PRODUCTS_AM),
+        price=rng.randrange(20, 5000, 5), phone=f"09{rng.randint(10000000, 99999999)}"
+    )
+
+def message_texts(count, seed=42):
+    """`count` message texts drawn as generate() draws them, e.g. a pool to sample from in SQL."""
+    rng = random.Random(f"{seed}:texts")
+    return [message_text(rng) for _ in range(count)]
+
+def product_image(rng, size):
+    """A JPEG of bottles and boxes on a plain background: cheap to draw, non-trivial to decode."""
+    image = Image.new('RGB', (size, size), rng.choice(COLORS))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(1, 4)):
+        x, y = rng.randrange(0, size * 3 // 4), rng.randrange(size // 4, size * 3 // 4)
+        w, h = rng.randint(size // 10, size // 4), rng.randint(size // 6, size // 2)
+        if rng.random() < 0.5:
+            draw.rounded_rectangle((x, y, x + w, y + h), radius=w // 4, fill=rng.choice(COLORS))
+            draw.rectangle((x + w // 3, y - h // 6, x + 2 * w // 3, y), fill=rng.choice(COLORS))
+        else:
+            draw.rectangle((x, y, x + w, y + h), fill=rng.choice(COLORS), outline=(0, 0, 0))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+def generate(out_dir, channels=4, messages=1000, days=7, image_ratio=0.4, repost_ratio=0.2, image_size=320, seed=42):
+    """
+    Writes `messages` messages for each of `channels` channels, spread evenly over `days`
+    days. `image_ratio` of messages carry a photo, and `repost_ratio` of those reuse a photo
+    posted earlier in any channel. Returns counts of what was written.
+    """
+    messages_dir = os.path.join(out_dir, 'data', 'raw', 'telegram_messages')
+    media_root = os.path.join(out_dir, 'data', 'raw', 'media')
+    index = media_store.open_index(media_root)
+    posted = []  # hashes of photos seen so far, in generation order
+    stats = {'channels': channels, 'messages': 0, 'files': 0, 'images': 0, 'distinct_images': 0, 'bytes': 0}
+    seconds_per_message = days * 86400 / max(messages, 1)
+    try:
+        for channel in channel_names(channels):
+            rng = random.Random(f"{seed}:{channel}")
+            outputs = {}
+            try:
+                for i in range(messages):
+                    message_date = START_DATE + timedelta(seconds=int(i * seconds_per_message) + rng.randrange(60))
+                    record = {
+                        'message_id': i + 1,
+                        'channel_name': channel,
+                        'message_date': message_date.isoformat(),
+                        'message_text': message_text(rng) if rng.random() < 0.95 else "",
+                        'has_media': rng.random() < image_ratio,
+                        'views': int(rng.paretovariate(1.5) * 300),
+                        'forwards': rng.randint(0, 50),
+                    }
+                    if record['has_media']:
+                        if posted and rng.random() < repost_ratio:
+                            sha256 = rng.choice(posted)
+                        else:
+                            tmp_path = media_store.temp_path(f"{channel}_{i}", media_root)
+                            with open(tmp_path, 'wb') as f:
+                                f.write(product_image(rng, image_size))
+                            sha256, is_new = media_store.add_file(index, tmp_path, root=media_root)
+                            if is_new:
+                                posted.append(sha256)
+                                stats['distinct_images'] += 1
+                        media_store.link_message(index, channel, record['message_id'], sha256)
+                        record['image_path'] = os.path.relpath(media_store.blob_path(sha256, media_root), out_dir)
+                        stats['images'] += 1
+
+                    day = message_date.strftime('%Y-%m-%d')
+                    if day not in outputs:
+                        os.makedirs(os.path.join(messages_dir, day), exist_ok=True)
+                        outputs[day] = open(os.path.join(messages_dir, day, f"{channel}.jsonl"), 'w', encoding='utf-8')
+                    outputs[day].write(json.dumps(record, ensure_ascii=False) + '\n')
+                    stats['messages'] += 1
+            finally:
+                for f in outputs.values():
+                    f.close()
+                    stats['bytes'] += os.path.getsize(f.name)
+            stats['files'] += len(outputs)
+    finally:
+        index.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic scraper output.")
+    parser.add_argument('--out', required=True, help="Directory to write data/raw/... under.")
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=1000, help="Messages per channel.")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--image-ratio', type=float, default=0.4)
+    parser.add_argument('--repost-ratio', type=float, default=0.2)
+    parser.add_argument('--image-size', type=int, default=320)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    stats = generate(args.out, args.channels, args.messages, args.days, args.image_ratio,
+                     args.repost_ratio, args.image_size, args.seed)
+    print(json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
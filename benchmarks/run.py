@@ -0,0 +1,154 @@
+"""
+Offline benchmark suite: generates deterministic synthetic data, then times the loader,
+YOLO enrichment, the dbt marts and every API endpoint against a disposable local Postgres
+database, and writes the results as JSON so runs can be compared across commits:
+
+    python -m benchmarks.run --channels 8 --messages 5000
+    python -m benchmarks.compare benchmarks/results/<before>.json benchmarks/results/<after>.json
+
+The scratch database (--database / BENCH_DB_NAME, default 'medical_bench') is dropped and
+recreated at the start of every run; the other DB_* settings come from .env. Data, the
+media store and stage metrics go to a temporary work directory (--work-dir to keep it).
+"""
+import os
+import sys
+import json
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'medical_bench')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+SCENARIOS = ['load', 'yolo', 'dbt', 'api']
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+# One line per API request drowns the report
+logging.getLogger('httpx').setLevel(logging.WARNING)
+
+def git_revision():
+    """(commit, dirty) of the checkout being benchmarked, or (None, None) outside git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def configure_environment(args, work_dir):
+    """Points every module the scenarios import at the scratch database and work directory."""
+    os.environ['DB_NAME'] = args.database
+    os.environ['MEDIA_STORE_DIR'] = os.path.join(work_dir, 'data', 'raw', 'media')
+    os.environ['METRICS_FILE'] = os.path.join(work_dir, 'logs', 'metrics.jsonl')
+    os.environ['METRICS_SNAPSHOT_FILE'] = os.path.join(work_dir, 'logs', 'metrics_latest.json')
+    os.environ['PROMETHEUS_FILE'] = os.path.join(work_dir, 'logs', 'metrics.prom')
+    # The YOLO scenario runs inside the work directory
+    os.environ['YOLO_MODEL'] = os.path.abspath(os.getenv('YOLO_MODEL', 'yolov8n.pt'))
+    if not args.with_cache:
+        os.environ['API_CACHE_ENABLED'] = '0'
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite and write JSON results.")
+    parser.add_argument('--channels', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=2000, help="Messages per channel.")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--image-ratio', type=float, default=0.4)
+    parser.add_argument('--repost-ratio', type=float, default=0.2)
+    parser.add_argument('--image-size', type=int, default=320)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--database', default=BENCH_DB_NAME, help="Scratch database, dropped and recreated.")
+    parser.add_argument('--work-dir', default=None, help="Keep generated data here instead of a temp dir.")
+    parser.add_argument('--load-workers', type=int, default=1)
+    parser.add_argument('--yolo-batch-size', type=int, default=16)
+    parser.add_argument('--yolo-workers', type=int, default=1)
+    parser.add_argument('--dbt-project-dir', default=os.path.join(ROOT, 'medical_warehouse'))
+    parser.add_argument('--api-runs', type=int, default=50, help="Timed requests per endpoint.")
+    parser.add_argument('--with-cache', action='store_true', help="Keep the API response cache enabled.")
+    parser.add_argument('--output', default=None, help="Results file (default benchmarks/results/<time>_<commit>.json).")
+    args = parser.parse_args()
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix='medical_bench_'))
+    os.makedirs(work_dir, exist_ok=True)
+    configure_environment(args, work_dir)
+    from benchmarks import generator, scenarios
+    from src import db, load_data as loader, yolo_detect
+
+    commit, dirty = git_revision()
+    started_at = datetime.now(timezone.utc)
+    report = {
+        'commit': commit,
+        'dirty': dirty,
+        'started_at': started_at.isoformat(),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'work_dir')},
+        'scenarios': [],
+    }
+    results = report['scenarios']
+    conn = None
+    try:
+        data, seconds = scenarios.timed(lambda: generator.generate(
+            work_dir, args.channels, args.messages, args.days, args.image_ratio,
+            args.repost_ratio, args.image_size, args.seed))
+        results.append(scenarios.result('generate', seconds, data))
+
+        db.create_database(args.database, drop_existing=True)
+        conn = db.connect_db()
+        if conn is None:
+            raise SystemExit(f"Could not connect to the scratch database {args.database}; see the log.")
+        report['host']['postgres'] = scenarios.server_version(conn)
+        loader.create_raw_schema(conn)
+        yolo_detect.create_detection_table(conn)
+        scenarios.enable_trigram(conn)
+
+        base_dir = os.path.join(work_dir, 'data', 'raw', 'telegram_messages')
+        stages = {
+            'load': lambda: scenarios.load_full(conn, base_dir, args.load_workers)
+                            + scenarios.load_unchanged(conn, base_dir),
+            'yolo': lambda: scenarios.yolo(conn, work_dir, args.yolo_batch_size, args.yolo_workers),
+            'dbt': lambda: scenarios.dbt_build(os.path.abspath(args.dbt_project_dir), full_refresh=True)
+                           + scenarios.dbt_build(os.path.abspath(args.dbt_project_dir), full_refresh=False),
+            'api': lambda: scenarios.api(generator.channel_names(args.channels)[0], args.api_runs),
+        }
+        for name in SCENARIOS:
+            if name not in args.scenarios:
+                continue
+            try:
+                results.extend(stages[name]())
+            except Exception as e:
+                results.append(scenarios.failed(name, e))
+    finally:
+        if conn is not None:
+            conn.close()
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{started_at.strftime('%Y%m%dT%H%M%SZ')}_{(commit or 'nogit')[:10]}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'scenario':<28} {'status':>7} {'seconds':>9} {'p50 ms':>9} {'p99 ms':>9}  throughput")
+    for entry in results:
+        rates = ', '.join(f"{value:,.0f} {unit}/s" for unit, value in entry.get('per_second', {}).items()
+                          if unit in ('rows', 'messages', 'images', 'requests'))
+        print(f"{entry['name']:<28} {entry['status']:>7} {entry.get('seconds', float('nan')):>9.2f} "
+              f"{entry.get('p50_ms', float('nan')):>9.2f} {entry.get('p99_ms', float('nan')):>9.2f}  {rates}")
+    print(f"\nResults written to {output}")
+    return 0 if all(entry['status'] != 'error' for entry in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
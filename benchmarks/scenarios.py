@@ -0,0 +1,171 @@
+"""
+Timed benchmark scenarios. Each runs one pipeline stage against the generated data and
+returns result dicts of the form
+
+    {'name': ..., 'status': 'ok' | 'error' | 'skipped', 'seconds': ..., 'counts': {...}, 'per_second': {...}}
+
+with DB round trips / peak RSS from the stage's instrumentation event where it has one,
+and latency percentiles for API endpoints. Import after benchmarks.run has pointed
+DB_NAME, MEDIA_STORE_DIR and METRICS_FILE at the scratch database and work directory.
+"""
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+import numpy as np
+import psycopg2
+
+from src import load_data as loader, yolo_detect, instrumentation
+
+def enable_trigram(conn):
+    """Fuzzy search needs pg_trgm; without it (no superuser, extension not installed) it is skipped."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        logging.warning(f"pg_trgm unavailable, fuzzy search will be skipped: {e}")
+
+def server_version(conn):
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version")
+        return cur.fetchone()[0]
+
+@contextmanager
+def working_directory(path):
+    """The YOLO stage reads and writes data/... relative to the current directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+def result(name, seconds, counts=None, event=None, **extra):
+    counts = counts or {}
+    entry = {
+        'name': name,
+        'status': 'ok',
+        'seconds': round(seconds, 3),
+        'counts': counts,
+        'per_second': {unit: round(value / seconds, 1) for unit, value in counts.items()} if seconds > 0 else {},
+    }
+    if event is not None:
+        entry['status'] = event['status']
+        entry['db_round_trips'] = event['db_round_trips']
+        entry['peak_rss_bytes'] = event['peak_rss_bytes']
+    entry.update(extra)
+    return entry
+
+def failed(name, error, status='error'):
+    if status == 'error':
+        logging.error(f"Benchmark scenario {name} failed: {error}")
+    else:
+        logging.warning(f"Benchmark scenario {name} skipped: {error}")
+    return {'name': name, 'status': status, 'error': str(error)}
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+def load_full(conn, base_dir, workers):
+    """Cold load of every generated file into an empty raw.telegram_messages."""
+    rows, seconds = timed(lambda: loader.load_data(conn, full_refresh=True, workers=workers, base_dir=base_dir))
+    if rows is None:
+        return [failed('load_full', "load_data failed; see logs/")]
+    event = instrumentation.last_event('load')
+    return [result('load_full', seconds, event['counts'], event, workers=workers)]
+
+def load_unchanged(conn, base_dir):
+    """Second load of the same files: the manifest check alone, nothing is reloaded."""
+    rows, seconds = timed(lambda: loader.load_data(conn, base_dir=base_dir))
+    if rows is None:
+        return [failed('load_unchanged', "load_data failed; see logs/")]
+    event = instrumentation.last_event('load')
+    return [result('load_unchanged', seconds, event['counts'], event)]
+
+def yolo(conn, work_dir, batch_size, workers):
+    """Detection over every generated image, with results written to raw.yolo_detections."""
+    with working_directory(work_dir):
+        processed, seconds = timed(lambda: yolo_detect.run_detection(
+            conn, batch_size=batch_size, full_refresh=True, workers=workers))
+    event = instrumentation.last_event('yolo')
+    if processed is None and event['counts'].get('images_failed'):
+        return [failed('yolo', "detections could not be saved; see logs/")]
+    if processed is None:
+        return [failed('yolo', "no images, or the model could not be prepared", status='skipped')]
+    return [result('yolo', seconds, event['counts'], event, batch_size=batch_size, workers=workers)]
+
+def dbt_build(project_dir, full_refresh, lookback_days=1):
+    """`dbt build` of the seeds, marts and tests; a full refresh first, then incrementally."""
+    from dbt.cli.main import dbtRunner
+    name = 'dbt_full_refresh' if full_refresh else 'dbt_incremental'
+    command = ['build', '--project-dir', project_dir, '--profiles-dir', project_dir,
+               '--vars', json.dumps({'lookback_days': lookback_days})]
+    if full_refresh:
+        command.append('--full-refresh')
+    outcome, seconds = timed(lambda: dbtRunner().invoke(command))
+    if not outcome.success:
+        return [failed(name, outcome.exception or "dbt build failed; see the dbt logs")]
+    nodes = outcome.result or []
+    counts = {
+        'nodes': len(nodes),
+        'rows': sum(node.adapter_response.get('rows_affected') or 0 for node in nodes),
+    }
+    slowest = sorted(nodes, key=lambda node: node.execution_time, reverse=True)[:5]
+    return [result(name, seconds, counts,
+                   slowest_nodes={node.node.name: round(node.execution_time, 3) for node in slowest})]
+
+def api_requests(channel):
+    return [
+        ('top_products', '/api/reports/top-products', {'limit': 10}),
+        ('top_products_channel', '/api/reports/top-products', {'limit': 10, 'channel': channel}),
+        ('channel_activity', f'/api/channels/{channel}/activity', {}),
+        ('visual_content', '/api/reports/visual-content', {}),
+        ('search_fts', '/api/search/messages', {'query': 'paracetamol', 'limit': 20}),
+        ('search_fts_amharic', '/api/search/messages', {'query': 'ዋጋ', 'limit': 20}),
+        ('search_fuzzy', '/api/search/messages', {'query': 'paracetmol', 'limit': 20, 'mode': 'fuzzy'}),
+        ('export_messages_ndjson', '/api/export/messages', {'format': 'ndjson'}),
+        ('export_detections_csv', '/api/export/image-detections', {'format': 'csv'}),
+    ]
+
+def response_rows(response):
+    """Rows in a JSON list, or lines in an NDJSON / CSV export (less the CSV header)."""
+    content_type = response.headers.get('content-type', '')
+    if content_type.startswith('application/json'):
+        return len(response.json())
+    return response.text.count('\n') - content_type.startswith('text/csv')
+
+def api(channel, runs):
+    """Latency of each endpoint through an in-process ASGI client (no network, no uvicorn)."""
+    from fastapi.testclient import TestClient
+    from api.main import app
+
+    results = []
+    with TestClient(app) as client:
+        for label, path, params in api_requests(channel):
+            name = f'api_{label}'
+            response = client.get(path, params=params)  # warm-up: pool, plans, caches
+            if response.status_code != 200:
+                # 501: an optional feature (pg_trgm) the database doesn't have
+                status = 'skipped' if response.status_code == 501 else 'error'
+                results.append(failed(name, f"HTTP {response.status_code}: {response.text[:200]}", status))
+                continue
+            latencies = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                client.get(path, params=params)
+                latencies.append(time.perf_counter() - start)
+            latencies = np.array(latencies) * 1000
+            results.append(result(
+                name, float(latencies.sum() / 1000), {'requests': runs},
+                path=path, params=params, rows=response_rows(response),
+                mean_ms=round(float(latencies.mean()), 3),
+                p50_ms=round(float(np.percentile(latencies, 50)), 3),
+                p95_ms=round(float(np.percentile(latencies, 95)), 3),
+                p99_ms=round(float(np.percentile(latencies, 99)), 3),
+            ))
+    return results
@@ -0,0 +1,17 @@
+{#
+    Stamps a new pipeline version after a dbt run/build that built at least one node.
+    The API keys its response cache and ETags on the latest version, so every cached
+    report is retired as soon as fresh marts are in place.
+#}
+{% macro bump_pipeline_version() %}
+    {% if execute and flags.WHICH in ('run', 'build') and results | selectattr('status', 'equalto', 'success') | list %}
+        create table if not exists {{ target.schema }}.pipeline_version (
+            version bigint primary key,
+            updated_at timestamp not null default current_timestamp
+        );
+        insert into {{ target.schema }}.pipeline_version (version)
+        select coalesce(max(version), 0) + 1 from {{ target.schema }}.pipeline_version;
+    {% else %}
+        select 1;
+    {% endif %}
+{% endmacro %}
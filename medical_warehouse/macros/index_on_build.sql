@@ -0,0 +1,11 @@
+{#
+    Post-hook for incremental models: creates an index when the table is first built or
+    rebuilt with --full-refresh, and is a no-op on incremental runs, which keep the
+    existing indexes. Indexes are unnamed because on a full refresh the backup table
+    still holds the old index names until after the post-hooks run.
+#}
+{% macro index_on_build(columns, unique=false, using=none, include=none) %}
+    {%- if not is_incremental() -%}
+        create {{ 'unique ' if unique }}index on {{ this }}{{ ' using ' ~ using if using }} ({{ columns }}){{ ' include (' ~ include ~ ')' if include }}
+    {%- endif -%}
+{% endmacro %}
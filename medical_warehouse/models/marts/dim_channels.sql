@@ -1,3 +1,12 @@
+{{
+    config(
+        post_hook=[
+            "create unique index on {{ this }} (channel_name) include (total_posts, avg_views)",
+            "create unique index on {{ this }} (channel_key)"
+        ]
+    )
+}}
+
 with base_channels as (
     select 
         channel_name,
@@ -1,31 +1,62 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key='detection_id',
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "{{ index_on_build('detection_id', unique=true) }}",
+            "{{ index_on_build('channel_key, message_id') }}",
+            "{{ index_on_build('date_key') }}",
+            "{{ index_on_build('detection_date') }}"
+        ]
+    )
+}}
+
+-- Detections are re-stamped whenever yolo_detect re-scores an image, so incremental runs
+-- pick up rows detected in the last `lookback_days` days before the newest one loaded.
+-- Already-scored images keep their detection_date, so the run also reselects detections of
+-- messages in fct_messages' lookback window (whose view counts may have changed) and those
+-- whose message had not been loaded yet, to refresh view_count and date_key.
+
 with detections as (
-    select * from {{ source('raw', 'yolo_detections') }}
+    select
+        *,
+        {{ dbt_utils.generate_surrogate_key(['channel_name']) }} as channel_key
+    from {{ source('raw', 'yolo_detections') }}
+    {% if is_incremental() %}
+    where detection_date >= (
+        select coalesce(max(detection_date), timestamp '1900-01-01') - interval '{{ var('lookback_days') }} days'
+        from {{ this }}
+    )
+       or ({{ dbt_utils.generate_surrogate_key(['channel_name']) }}, message_id) in (
+            select channel_key, message_id
+            from {{ ref('fct_messages') }}
+            where message_timestamp >= (
+                select max(message_timestamp) - interval '{{ var('lookback_days') }} days'
+                from {{ ref('fct_messages') }}
+            )
+        )
+       or id in (select detection_id from {{ this }} where date_key is null)
+    {% endif %}
 ),
 
 messages as (
     select * from {{ ref('fct_messages') }}
-),
-
-dim_channels as (
-    select * from {{ ref('dim_channels') }}
-),
-
-dim_dates as (
-    select * from {{ ref('dim_dates') }}
 )
 
 select
     d.id as detection_id,
     d.message_id,
     d.channel_name,
-    c.channel_key,
+    d.channel_key,
     m.date_key,
     d.image_path,
     d.primary_class,
     d.confidence_score,
     d.image_category,
+    m.view_count,
+    d.detected_objects,
+    jsonb_array_length(d.detected_objects) as object_count,
     d.detection_date
 from detections d
-left join messages m on d.message_id = m.message_id
-left join dim_channels c on d.channel_name = c.channel_name
--- Join/Scan date key based on message timestamp matching not needed if we join fct_messages which has date_key
+left join messages m on m.channel_key = d.channel_key and m.message_id = d.message_id
@@ -0,0 +1,69 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['keyword', 'channel_name', 'date_key'],
+        incremental_strategy='delete+insert',
+        on_schema_change='append_new_columns',
+        post_hook=[
+            "{{ index_on_build('date_key', include='keyword, mention_count') }}",
+            "{{ index_on_build('channel_name, date_key', include='keyword, mention_count') }}"
+        ]
+    )
+}}
+
+-- Keyword mentions per (keyword, channel, day), tokenized once with the same 'simple'
+-- text-search parser as fct_messages.search_vector (lower-cased, punctuation split,
+-- works for Amharic and English). Incremental runs recompute the last `lookback_days` days,
+-- and every (channel, day) that received messages since the last run (message_pk follows
+-- load order), so late-loaded older messages are counted too.
+
+with messages as (
+    select
+        message_pk,
+        channel_name,
+        message_timestamp,
+        message_text
+    from {{ ref('stg_telegram_messages') }}
+    where not is_empty
+    {% if is_incremental() %}
+      and (
+        message_timestamp >= (
+            select coalesce(to_date(max(date_key)::text, 'YYYYMMDD'), date '1900-01-01') - {{ var('lookback_days') }}
+            from {{ this }}
+        )
+        or (channel_name, cast(message_timestamp as date)) in (
+            select channel_name, cast(message_timestamp as date)
+            from {{ ref('stg_telegram_messages') }}
+            where message_pk > (select coalesce(max(max_message_pk), 0) from {{ this }})
+        )
+      )
+    {% endif %}
+),
+
+tokens as (
+    select
+        m.message_pk,
+        m.channel_name,
+        cast(to_char(m.message_timestamp, 'YYYYMMDD') as integer) as date_key,
+        t.lexeme as keyword,
+        cardinality(t.positions) as mentions
+    from messages m
+    cross join lateral unnest(to_tsvector('simple', m.message_text)) as t
+    where length(t.lexeme) >= {{ var('keyword_min_length') }}
+      and t.lexeme !~ '^[0-9]+$'  -- bare numbers (prices, phone fragments)
+      and t.lexeme !~ '[./@:]'    -- URL, e-mail and handle fragments
+)
+
+select
+    t.keyword,
+    t.channel_name,
+    {{ dbt_utils.generate_surrogate_key(['t.channel_name']) }} as channel_key,
+    t.date_key,
+    count(*) as message_count,
+    sum(t.mentions) as mention_count,
+    max(t.message_pk) as max_message_pk
+from tokens t
+where not exists (
+    select 1 from {{ ref('stop_words') }} s where s.word = t.keyword
+)
+group by t.keyword, t.channel_name, t.date_key
@@ -1,24 +1,46 @@
-with messages as (
-    select * from {{ ref('stg_telegram_messages') }}
-),
+{{
+    config(
+        materialized='incremental',
+        unique_key='message_pk',
+        incremental_strategy='delete+insert',
+        post_hook=[
+            "{{ index_on_build('channel_key, message_id', unique=true) }}",
+            "{{ index_on_build('message_pk', unique=true) }}",
+            "{{ index_on_build('message_timestamp') }}",
+            "{{ index_on_build('date_key') }}",
+            "{{ index_on_build('search_vector', using='gin') }}",
+            "{% if not is_incremental() %} do $$ begin if exists (select 1 from pg_extension where extname = 'pg_trgm') then execute 'create index on {{ this }} using gin (message_text gin_trgm_ops)'; end if; end $$ {% endif %}"
+        ]
+    )
+}}
 
-dim_channels as (
-    select * from {{ ref('dim_channels') }}
-),
+-- Incremental runs reprocess messages posted in the last `lookback_days` days before the
+-- newest one already loaded, so view and forward counts refreshed by later scrapes land too,
+-- plus every message loaded since the last run (message_pk follows load order), however old
+-- its timestamp: a newly added channel or a backlog paged in oldest-first. Photo-only posts
+-- (empty text) are kept, with no search_vector.
 
-dim_dates as (
-    select * from {{ ref('dim_dates') }}
+with messages as (
+    select * from {{ ref('stg_telegram_messages') }}
+    {% if is_incremental() %}
+    where message_timestamp >= (
+        select coalesce(max(message_timestamp), timestamp '1900-01-01') - interval '{{ var('lookback_days') }} days'
+        from {{ this }}
+    )
+       or message_pk > (select coalesce(max(message_pk), 0) from {{ this }})
+    {% endif %}
 )
 
 select
+    m.message_pk,
     m.message_id,
-    c.channel_key,
-    d.date_key,
+    {{ dbt_utils.generate_surrogate_key(['m.channel_name']) }} as channel_key,
+    cast(to_char(m.message_timestamp, 'YYYYMMDD') as integer) as date_key,
+    m.message_timestamp,
     m.message_text,
+    case when m.is_empty then null else to_tsvector('simple', m.message_text) end as search_vector,
     m.message_length,
     m.view_count,
     m.forward_count,
     m.has_image
 from messages m
-left join dim_channels c on m.channel_name = c.channel_name
-left join dim_dates d on cast(m.message_timestamp as date) = d.full_date
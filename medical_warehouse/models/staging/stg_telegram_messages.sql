@@ -4,6 +4,7 @@ with raw_data as (
 
 cleaned_data as (
     select
+        id as message_pk,
         message_id,
         channel_name,
         cast(message_date as timestamp) as message_timestamp,
@@ -13,10 +14,11 @@ cleaned_data as (
         coalesce(forwards, 0) as forward_count,
         has_media as has_image,
         image_path,
-        length(message_text) as message_length
+        coalesce(length(message_text), 0) as message_length
     from raw_data
     where message_id is not null
 )
 
+-- Photo-only posts have no text but still count as posts and carry views for their
+-- detections; text models (search, keywords) filter on is_empty themselves
 select * from cleaned_data
-where not is_empty
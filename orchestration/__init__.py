@@ -1,8 +1,15 @@
-from dagster import Definitions, load_assets_from_modules
-from .jobs import medical_pipeline_job
+import os
+from dagster import Definitions, load_assets_from_modules, multiprocess_executor
+from . import assets
+from .jobs import ingestion_job
 from .schedules import daily_schedule
 
+# Steps of a run (e.g. loading and YOLO of one partition) execute in parallel processes
+DAGSTER_MAX_CONCURRENT = int(os.getenv('DAGSTER_MAX_CONCURRENT', str(os.cpu_count() or 4)))
+
 defs = Definitions(
-    jobs=[medical_pipeline_job],
+    assets=load_assets_from_modules([assets]),
+    jobs=[ingestion_job],
     schedules=[daily_schedule],
+    executor=multiprocess_executor.configured({'max_concurrent': DAGSTER_MAX_CONCURRENT}),
 )
@@ -0,0 +1,144 @@
+import os
+import json
+import asyncio
+from datetime import date
+from dagster import (
+    asset,
+    AssetDep,
+    AssetExecutionContext,
+    AutomationCondition,
+    BackfillPolicy,
+    DailyPartitionsDefinition,
+    Failure,
+    MaterializeResult,
+    MultiPartitionsDefinition,
+    MultiToSingleDimensionPartitionMapping,
+    StaticPartitionsDefinition,
+)
+from src import db, scraper, load_data, instrumentation
+
+# Pipeline code runs in the step's own process (no `python -m` subprocesses), with paths
+# relative to the repo root that `dagster dev -m orchestration` is started from.
+PIPELINE_START_DATE = os.getenv('PIPELINE_START_DATE', '2026-01-01')
+DBT_PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'medical_warehouse')
+
+daily_partitions = DailyPartitionsDefinition(start_date=PIPELINE_START_DATE)
+channel_partitions = StaticPartitionsDefinition(scraper.CHANNELS)
+message_partitions = MultiPartitionsDefinition({'date': daily_partitions, 'channel': channel_partitions})
+
+# The dbt marts for a day wait for every channel's partition of that day
+by_date = MultiToSingleDimensionPartitionMapping(partition_dimension_name='date')
+
+def partition_keys(context):
+    keys = context.partition_key.keys_by_dimension
+    return date.fromisoformat(keys['date']), keys['channel']
+
+def partition_files(day, channel):
+    """Manifest keys of the files the scraper wrote for one (date, channel) partition."""
+    if not os.path.exists(load_data.BASE_DIR):
+        return set()
+    folder = day.strftime('%Y-%m-%d')
+    files = set()
+    for manifest_key, _ in load_data.list_message_files(load_data.BASE_DIR):
+        file_folder, file_name = manifest_key.split('/', 1)
+        # The scraper names files after the channel's username, whose case may differ
+        if file_folder == folder and file_name.split('.')[0].lower() == channel.lower():
+            files.add(manifest_key)
+    return files
+
+async def scrape_partition(channel, day):
+    async with scraper.create_client() as client:
+        await scraper.scrape_channel(client, channel, budget=0, day=day)
+
+@asset(partitions_def=message_partitions, pool='telegram', group_name='ingestion')
+def raw_message_files(context: AssetExecutionContext) -> MaterializeResult:
+    """
+    NDJSON messages one channel posted on the partition date, with their photos in the media
+    store. One Telegram session is shared, so the `telegram` pool should be limited to 1.
+    """
+    if not scraper.API_ID or not scraper.API_HASH:
+        raise Failure("TG_API_ID and TG_API_HASH must be set in .env")
+    day, channel = partition_keys(context)
+    asyncio.run(scrape_partition(channel, day))
+    return MaterializeResult(metadata=instrumentation.dagster_metadata(instrumentation.last_event('scrape')))
+
+@asset(partitions_def=message_partitions, deps=[raw_message_files], pool='raw_messages_load', group_name='ingestion')
+def raw_messages(context: AssetExecutionContext) -> MaterializeResult:
+    """
+    The partition's messages upserted into raw.telegram_messages. Each load stages under its
+    own run id and merges under an advisory lock, so partitions can load concurrently; the
+    `raw_messages_load` pool only caps how many do.
+    """
+    day, channel = partition_keys(context)
+    files = partition_files(day, channel)
+    if not files:
+        context.log.info(f"No scraped file for {channel} on {day}.")
+        return MaterializeResult(metadata={'rows': 0})
+    with db.connection(bulk=True) as conn:
+        load_data.create_raw_schema(conn)
+        rows = load_data.load_data(conn, only=files)
+    if rows is None:
+        raise Failure("Loading failed; see logs/")
+    return MaterializeResult(metadata=instrumentation.dagster_metadata(instrumentation.last_event('load')))
+
+@asset(partitions_def=message_partitions, deps=[raw_message_files], group_name='ingestion')
+def image_detections(context: AssetExecutionContext) -> MaterializeResult:
+    """
+    YOLO detections for the partition's photos in raw.yolo_detections. Reads the scraped files
+    rather than the database, so it runs alongside raw_messages.
+    """
+    # Imported here so only YOLO steps pay for torch/ultralytics
+    from src import yolo_detect
+
+    day, channel = partition_keys(context)
+    messages = set()
+    for manifest_key in partition_files(day, channel):
+        path = os.path.join(load_data.BASE_DIR, manifest_key)
+        for row in load_data.iter_file_messages(path):
+            message_id, channel_name, has_media = row[0], row[1], row[4]
+            if has_media:
+                messages.add((channel_name, str(message_id)))
+    if not messages:
+        return MaterializeResult(metadata={'images': 0})
+
+    with db.connection(bulk=True) as conn:
+        yolo_detect.create_detection_table(conn)
+        processed = yolo_detect.run_detection(conn, only=messages)
+    if processed is None:
+        raise Failure("YOLO detection failed; see logs/")
+    return MaterializeResult(metadata=instrumentation.dagster_metadata(instrumentation.last_event('yolo')))
+
+@asset(
+    partitions_def=daily_partitions,
+    deps=[AssetDep(raw_messages, partition_mapping=by_date), AssetDep(image_detections, partition_mapping=by_date)],
+    automation_condition=AutomationCondition.eager(),
+    backfill_policy=BackfillPolicy.single_run(),
+    group_name='warehouse',
+)
+def dbt_marts(context: AssetExecutionContext) -> MaterializeResult:
+    """
+    `dbt build` of the warehouse, run in-process. Incremental models reprocess every day from
+    the earliest selected partition, so a backfill of N days is a single dbt run.
+    """
+    from dbt.cli.main import dbtRunner
+
+    first_day = context.partition_time_window.start.date()
+    lookback_days = max(1, (date.today() - first_day).days + 1)
+    with instrumentation.stage('dbt') as metrics:
+        result = dbtRunner().invoke([
+            'build',
+            '--project-dir', DBT_PROJECT_DIR,
+            '--profiles-dir', DBT_PROJECT_DIR,
+            '--vars', json.dumps({'lookback_days': lookback_days}),
+        ])
+        nodes = result.result or []
+        metrics.add('nodes', len(nodes))
+        metrics.add('nodes_passed', sum(node.status in ('success', 'pass') for node in nodes))
+        # Rows written by models, as reported by the adapter
+        metrics.add('rows', sum(node.adapter_response.get('rows_affected') or 0 for node in nodes))
+        if not result.success:
+            metrics.fail()
+    if not result.success:
+        raise Failure(f"dbt build failed: {result.exception or 'see medical_warehouse/logs/dbt.log'}")
+    metadata = instrumentation.dagster_metadata(instrumentation.last_event('dbt'))
+    return MaterializeResult(metadata={'lookback_days': lookback_days, **metadata})
@@ -1,22 +1,9 @@
-from dagster import job
-from .ops import (
-    scrape_telegram_data,
-    load_raw_to_postgres,
-    run_yolo_enrichment,
-    run_dbt_transformations
-)
+from dagster import AssetSelection, define_asset_job
+from .assets import raw_message_files, raw_messages, image_detections
 
-@job
-def medical_pipeline_job():
-    # Define dependencies
-    scrape_output = scrape_telegram_data()
-    load_output = load_raw_to_postgres(start_after=scrape_output)
-    
-    # YOLO and DBT can technically run in parallel after load, 
-    # BUT dbt relies on YOLO data for fct_image_detections.
-    # So YOLO must run before dbt.
-    
-    yolo_output = run_yolo_enrichment(start_after=load_output)
-    
-    # Pass yolo_output to dbt to ensure ordering
-    run_dbt_transformations(start_after=yolo_output)
+# Scrape -> (load || YOLO) for one (date, channel) partition; dbt_marts follows once every
+# channel's partition of the day is in, through its eager automation condition.
+ingestion_job = define_asset_job(
+    'ingestion_job',
+    selection=AssetSelection.assets(raw_message_files, raw_messages, image_detections),
+)
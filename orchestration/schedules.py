@@ -1,7 +1,7 @@
-from dagster import ScheduleDefinition
-from .jobs import medical_pipeline_job
+from dagster import build_schedule_from_partitioned_job
+from .jobs import ingestion_job
 
-daily_schedule = ScheduleDefinition(
-    job=medical_pipeline_job,
-    cron_schedule="0 0 * * *",  # Run daily at midnight
+# Shortly after midnight, one run per channel for the day that just ended
+daily_schedule = build_schedule_from_partitioned_job(
+    ingestion_job, name='daily_schedule', hour_of_day=0, minute_of_hour=5
 )
@@ -1,21 +1,14 @@
 import os
+import sys
 import psycopg2
-from dotenv import load_dotenv
 import pandas as pd
 
-load_dotenv()
-
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5433')
-DB_NAME = os.getenv('DB_NAME', 'medical_db')
-DB_USER = os.getenv('DB_USER', 'sa')
-DB_PASS = os.getenv('DB_PASS', '123')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import db  # noqa: E402
 
 def analyze():
     try:
-        conn = psycopg2.connect(
-            host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER, password=DB_PASS
-        )
+        conn = psycopg2.connect(**db.connection_params())
         
         # Query: Average views per image category
         query = """
@@ -0,0 +1,82 @@
+"""
+CPU inference backend benchmark.
+
+Runs a sample of the scraped images through each backend / input size / precision,
+one image at a time, and reports latency plus accuracy drift against the torch @ 640px
+baseline (agreement on primary class and image category, mean confidence change):
+
+    python scripts/benchmark_backends.py --sample 200 --configs torch:640 onnxruntime:640 onnxruntime:480:int8 openvino:480
+
+Exported models are created on first use next to the .pt weights (see yolo_detect.py --export).
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import yolo_detect  # noqa: E402
+
+BASELINE = ('torch', 640, False)
+
+def parse_config(text):
+    parts = text.split(':')
+    return parts[0], int(parts[1]) if len(parts) > 1 else yolo_detect.DEFAULT_IMGSZ, 'int8' in parts[2:]
+
+def run_config(backend, imgsz, int8, arrays):
+    model_path = yolo_detect.resolve_model(backend, imgsz, int8)
+    model, class_names = yolo_detect.load_model(model_path)
+    model(arrays[0], imgsz=imgsz, verbose=False)  # warm-up
+
+    latencies, summaries = [], []
+    for array in arrays:
+        start = time.perf_counter()
+        result = model(array, imgsz=imgsz, verbose=False)[0]
+        latencies.append(time.perf_counter() - start)
+        summaries.append(yolo_detect.summarize_result(result, class_names))
+    return np.array(latencies) * 1000, summaries
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare YOLO inference backends on CPU.")
+    parser.add_argument('--images-dir', default='data/raw/images')
+    parser.add_argument('--sample', type=int, default=200, help="Number of images sampled (fixed seed).")
+    parser.add_argument('--configs', nargs='+', default=None,
+                        help="backend:imgsz[:int8] entries; defaults to every installed backend at 640 and 480.")
+    args = parser.parse_args()
+
+    if args.configs:
+        configs = [parse_config(c) for c in args.configs]
+    else:
+        configs = []
+        for backend in yolo_detect.BACKEND_MODULES:
+            try:
+                yolo_detect.check_backend(backend)
+            except RuntimeError:
+                continue
+            configs += [(backend, 640, False), (backend, 480, False)]
+    if BASELINE not in configs:
+        configs.insert(0, BASELINE)
+
+    images = yolo_detect.list_all_images(args.images_dir)
+    images = random.Random(0).sample(images, min(args.sample, len(images)))
+    arrays = [a for a in (cv2.imread(image[2]) for image in images) if a is not None]
+    print(f"Benchmarking {len(arrays)} images from {args.images_dir}")
+
+    results = {config: run_config(*config, arrays) for config in configs}
+    _, baseline = results[BASELINE]
+
+    print(f"\n{'backend':<12} {'imgsz':>5} {'int8':>5} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>7} "
+          f"{'class agree':>12} {'category agree':>15} {'mean |dconf|':>13}")
+    for (backend, imgsz, int8), (latencies, summaries) in results.items():
+        class_agree = np.mean([s[0] == b[0] for s, b in zip(summaries, baseline)]) * 100
+        category_agree = np.mean([s[3] == b[3] for s, b in zip(summaries, baseline)]) * 100
+        conf_drift = np.mean([abs(s[1] - b[1]) for s, b in zip(summaries, baseline)])
+        print(f"{backend:<12} {imgsz:>5} {str(int8):>5} {np.percentile(latencies, 50):>8.1f} "
+              f"{np.percentile(latencies, 95):>8.1f} {1000 / latencies.mean():>7.1f} "
+              f"{class_agree:>11.1f}% {category_agree:>14.1f}% {conf_drift:>13.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Loader throughput benchmark.
+
+Generates synthetic scraper output with the shared benchmark generator
+(benchmarks/generator.py: NDJSON, one file per channel per day) and loads it into a
+scratch database once per worker count, so scaling can be compared directly:
+
+    python scripts/benchmark_loader.py --channels 8 --days 4 --messages 25000 --workers 1 2 4 8
+
+The scratch database (BENCH_DB_NAME, default 'medical_bench') is created if missing and
+its raw tables are truncated before every run; the other DB_* settings come from .env.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'medical_bench')
+os.environ['DB_NAME'] = BENCH_DB_NAME
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import db, load_data as loader  # noqa: E402
+from benchmarks import generator  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark src/load_data.py throughput by worker count.")
+    parser.add_argument('--channels', type=int, default=8)
+    parser.add_argument('--days', type=int, default=4)
+    parser.add_argument('--messages', type=int, default=25000, help="Messages per channel per day.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=loader.LOAD_BATCH_SIZE)
+    parser.add_argument('--method', choices=['copy', 'values'], default='copy')
+    args = parser.parse_args()
+
+    db.create_database(BENCH_DB_NAME)
+    conn = db.connect_db()
+    loader.create_raw_schema(conn)
+
+    work_dir = tempfile.mkdtemp(prefix='loader_bench_')
+    base_dir = os.path.join(work_dir, 'data', 'raw', 'telegram_messages')
+    try:
+        # The loader only reads message files, so no images are drawn
+        stats = generator.generate(work_dir, channels=args.channels, messages=args.days * args.messages,
+                                   days=args.days, image_ratio=0.0)
+        print(f"Generated {stats['messages']:,} messages in {stats['files']} files under {base_dir}")
+
+        results = []
+        for workers in args.workers:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE raw.telegram_messages, raw.load_manifest")
+            conn.commit()
+            start = time.perf_counter()
+            rows = loader.load_data(conn, batch_size=args.batch_size, method=args.method,
+                                    full_refresh=True, workers=workers, base_dir=base_dir)
+            elapsed = time.perf_counter() - start
+            results.append((workers, rows or 0, elapsed))
+
+        print(f"\n{'workers':>8} {'rows':>12} {'seconds':>9} {'rows/sec':>12} {'speedup':>8}")
+        baseline = results[0][1] / results[0][2] if results and results[0][2] else 0
+        for workers, rows, elapsed in results:
+            rate = rows / elapsed if elapsed else 0
+            speedup = rate / baseline if baseline else 0
+            print(f"{workers:>8} {rows:>12,} {elapsed:>9.2f} {rate:>12,.0f} {speedup:>7.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        conn.close()
+
+if __name__ == "__main__":
+    main()
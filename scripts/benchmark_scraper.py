@@ -0,0 +1,121 @@
+"""
+Offline scraper throughput benchmark.
+
+Runs src/scraper.py's scrape_channel against a fake Telegram client that simulates
+per-page and per-download latency (and optional FloodWaits), once per download worker
+count, and prints messages/sec and MB/sec. --repost-ratio makes that share of photos
+reposts of earlier ones, which the media store links instead of downloading:
+
+    python scripts/benchmark_scraper.py --messages 2000 --photo-ratio 0.5 --repost-ratio 0.3 --workers 1 4 8 16
+
+Output is written under a temporary directory, never into data/.
+"""
+import os
+import sys
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from telethon.errors import FloodWaitError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import scraper  # noqa: E402
+
+class FakeTelegramClient:
+    """The subset of TelegramClient used by scrape_channel, with simulated latency."""
+
+    def __init__(self, messages, photo_ratio=0.5, repost_ratio=0.0, page_size=100, page_latency=0.05,
+                 download_latency=0.1, photo_bytes=80_000, flood_every=0, seed=42):
+        rng = random.Random(seed)
+        start = datetime(2026, 1, 1)
+        self.messages, photo_ids = [], []
+        for i in range(1, messages + 1):
+            photo = None
+            if rng.random() < photo_ratio:
+                if photo_ids and rng.random() < repost_ratio:
+                    photo = SimpleNamespace(id=rng.choice(photo_ids))
+                else:
+                    photo = SimpleNamespace(id=1_000_000 + i)
+                    photo_ids.append(photo.id)
+            self.messages.append(SimpleNamespace(
+                id=i, date=start + timedelta(minutes=i), message=f"message {i}",
+                media=photo, photo=photo, views=rng.randint(0, 20000), forwards=rng.randint(0, 200),
+            ))
+        self.page_size = page_size
+        self.page_latency = page_latency
+        self.download_latency = download_latency
+        self.photo_bytes = photo_bytes
+        self.flood_every = flood_every
+        self.requests = 0
+
+    def _request(self):
+        self.requests += 1
+        if self.flood_every and self.requests % self.flood_every == 0:
+            raise FloodWaitError(request=None, capture=1)
+
+    async def get_entity(self, username):
+        return SimpleNamespace(username=username, title=username)
+
+    async def iter_messages(self, entity, min_id=0, reverse=False, limit=None):
+        selected = [m for m in self.messages if m.id > min_id]
+        if not reverse:
+            selected.reverse()
+        selected = selected[:limit]
+        for i in range(0, len(selected), self.page_size):
+            await asyncio.sleep(self.page_latency)
+            self._request()
+            for message in selected[i:i + self.page_size]:
+                yield message
+
+    async def download_media(self, photo, file):
+        await asyncio.sleep(self.download_latency)
+        self._request()
+        with open(file, 'wb') as f:
+            f.write(str(photo.id).encode().ljust(self.photo_bytes, b'\0'))
+        return file
+
+async def run(args, workers):
+    client = FakeTelegramClient(
+        args.messages, photo_ratio=args.photo_ratio, repost_ratio=args.repost_ratio, page_latency=args.page_latency,
+        download_latency=args.download_latency, flood_every=args.flood_every,
+    )
+    throttle = scraper.AdaptiveThrottle()
+    _, last_id, stats = await scraper.scrape_channel(
+        client, 'bench_channel', 0, throttle, download_workers=workers, budget=0
+    )
+    return last_id, stats, throttle.flood_waits
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scrape_channel against a fake Telegram client.")
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--photo-ratio', type=float, default=0.5)
+    parser.add_argument('--repost-ratio', type=float, default=0.0, help="Share of photos reposting an earlier one.")
+    parser.add_argument('--page-latency', type=float, default=0.05, help="Seconds per 100-message page.")
+    parser.add_argument('--download-latency', type=float, default=0.05, help="Seconds per photo download.")
+    parser.add_argument('--flood-every', type=int, default=0, help="Raise a 1s FloodWait every N requests (0 = never).")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix='scraper_bench_')
+    os.chdir(work_dir)
+    try:
+        results = []
+        for workers in args.workers:
+            last_id, stats, flood_waits = asyncio.run(run(args, workers))
+            results.append((workers, last_id, stats, flood_waits))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{'workers':>8} {'messages':>9} {'images':>7} {'reused':>7} {'seconds':>8} {'msg/sec':>9} {'MB/sec':>7} {'floodwaits':>11}")
+    for workers, last_id, stats, flood_waits in results:
+        elapsed = stats['seconds'] or 1e-9
+        print(f"{workers:>8} {stats['messages']:>9} {stats['media']:>7} {stats['reused']:>7} {stats['seconds']:>8.2f} "
+              f"{stats['messages'] / elapsed:>9.1f} {stats['bytes'] / elapsed / 1e6:>7.2f} {flood_waits:>11}")
+
+if __name__ == "__main__":
+    main()
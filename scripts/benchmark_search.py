@@ -0,0 +1,162 @@
+"""
+Message search latency benchmark.
+
+Grows raw.telegram_messages in a scratch database to each size with synthetic
+Amharic/English messages (texts from the shared benchmark generator, benchmarks/generator.py)
+and rebuilds the fct_messages / dim_channels marts the search
+reads (same columns and indexes as the dbt models), then times /api/search/messages
+(full-text and, when pg_trgm is installed, fuzzy) against the old unranked ILIKE scan on
+the raw table, reporting p50/p99 latency:
+
+    python scripts/benchmark_search.py --sizes 100000 1000000 10000000 --runs 20
+
+The scratch database (BENCH_DB_NAME, default 'medical_bench') is created if missing and
+its raw.telegram_messages table is truncated first; the other DB_* settings come from .env.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'medical_bench')
+os.environ['DB_NAME'] = BENCH_DB_NAME
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import db, load_data as loader  # noqa: E402
+from api.main import search_messages  # noqa: E402
+from api.database import SessionLocal, init_engine, MARTS_SCHEMA  # noqa: E402
+from benchmarks import generator  # noqa: E402
+
+# Distinct texts sampled per row; enough that rows don't repeat within a page of results
+TEXT_POOL_SIZE = 20_000
+CHANNELS = generator.channel_names(8)
+# Not in the generator's vocabulary; roughly one message in a thousand gets one appended
+RARE_WORDS = ['oseltamivir', 'ሜትፎርሚን']
+QUERIES = ['paracetamol', 'ዋጋ', 'vitamin syrup', 'oseltamivir', 'ሜትፎርሚን', 'nonexistentdrug']
+
+ILIKE_QUERY = text("""
+    SELECT id, message_date, channel_name, message_text, views
+    FROM raw.telegram_messages
+    WHERE message_text ILIKE :query
+    LIMIT :limit
+""")
+
+def grow_table(conn, start, end, texts):
+    """
+    Inserts synthetic messages with message_id in (start, end], sampling `texts` in SQL
+    for speed (millions of rows are too slow to write as files and load).
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT generate_series(date_trunc('month', TIMESTAMP '2026-01-01' + %s * INTERVAL '1 minute'),
+                                   TIMESTAMP '2026-01-01' + %s * INTERVAL '1 minute', INTERVAL '1 month')
+        """, (start + 1, end))
+        loader.ensure_partitions(cur, [row[0] for row in cur.fetchall()])
+        cur.execute("SELECT setseed(%s)", (start / (end + 1),))
+        cur.execute("""
+            INSERT INTO raw.telegram_messages
+                (message_id, channel_name, message_date, message_text, has_media, views, forwards)
+            SELECT g, (%(channels)s::TEXT[])[1 + g %% %(channel_count)s], TIMESTAMP '2026-01-01' + g * INTERVAL '1 minute',
+                   (%(texts)s::TEXT[])[1 + floor(random() * %(text_count)s)::INT]
+                   || CASE WHEN random() < 0.001
+                             THEN ' ' || (%(rare)s::TEXT[])[1 + floor(random() * %(rare_count)s)::INT]
+                             ELSE '' END,
+                   random() < 0.4, floor(random() * 20000)::INT, floor(random() * 200)::INT
+            FROM generate_series(%(start)s + 1, %(end)s) g
+        """, {'channels': CHANNELS, 'channel_count': len(CHANNELS), 'texts': texts, 'text_count': len(texts),
+              'rare': RARE_WORDS, 'rare_count': len(RARE_WORDS), 'start': start, 'end': end})
+        cur.execute("ANALYZE raw.telegram_messages")
+    conn.commit()
+
+def build_marts(conn, trigram):
+    """Stand-in for `dbt run -s dim_channels fct_messages` on the synthetic data."""
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            DROP TABLE IF EXISTS {MARTS_SCHEMA}.fct_messages, {MARTS_SCHEMA}.dim_channels;
+            CREATE TABLE {MARTS_SCHEMA}.dim_channels AS
+            SELECT md5(channel_name) AS channel_key, channel_name,
+                   count(*) AS total_posts, avg(views) AS avg_views
+            FROM raw.telegram_messages GROUP BY channel_name;
+            CREATE UNIQUE INDEX ON {MARTS_SCHEMA}.dim_channels (channel_key);
+            CREATE TABLE {MARTS_SCHEMA}.fct_messages AS
+            SELECT id AS message_pk, message_id, md5(channel_name) AS channel_key,
+                   to_char(message_date, 'YYYYMMDD')::INT AS date_key, message_date AS message_timestamp,
+                   message_text, to_tsvector('simple', message_text) AS search_vector,
+                   coalesce(views, 0) AS view_count
+            FROM raw.telegram_messages WHERE message_text <> '';
+            CREATE UNIQUE INDEX ON {MARTS_SCHEMA}.fct_messages (message_pk);
+            CREATE INDEX ON {MARTS_SCHEMA}.fct_messages USING GIN (search_vector);
+        """)
+        if trigram:
+            cur.execute(f"CREATE INDEX ON {MARTS_SCHEMA}.fct_messages USING GIN (message_text gin_trgm_ops)")
+        cur.execute(f"ANALYZE {MARTS_SCHEMA}.fct_messages")
+        cur.execute(f"ANALYZE {MARTS_SCHEMA}.dim_channels")
+    conn.commit()
+
+def time_call(fn, runs):
+    fn()  # warm-up
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message search latency against the ILIKE scan.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--runs', type=int, default=20, help="Timed runs per query and mode.")
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    db.create_database(BENCH_DB_NAME)
+    conn = db.connect_db()
+    loader.create_raw_schema(conn)
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE raw.telegram_messages")
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        trigram = cur.fetchone() is not None
+        modes = ['ilike', 'fts'] + (['fuzzy'] if trigram else [])
+    conn.commit()
+
+    init_engine(use_async=False)
+    session = SessionLocal()
+    loop = asyncio.new_event_loop()
+    searches = {
+        'ilike': lambda q: session.execute(ILIKE_QUERY, {"query": f"%{q}%", "limit": args.limit}).fetchall(),
+        'fts': lambda q: loop.run_until_complete(
+            search_messages(q, limit=args.limit, mode='fts', after_rank=None, after_id=None, db=session)),
+        'fuzzy': lambda q: loop.run_until_complete(
+            search_messages(q, limit=args.limit, mode='fuzzy', after_rank=None, after_id=None, db=session)),
+    }
+
+    texts = generator.message_texts(TEXT_POOL_SIZE)
+    rows = 0
+    print(f"\n{'rows':>12} {'mode':>6} {'query':<18} {'hits':>5} {'p50 ms':>9} {'p99 ms':>9}")
+    try:
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            grow_table(conn, rows, size, texts)
+            build_marts(conn, trigram)
+            rows = size
+            print(f"-- grew table to {rows:,} rows and rebuilt the marts in {time.perf_counter() - start:.1f}s")
+            for mode in modes:
+                for query in QUERIES:
+                    hits = len(searches[mode](query))
+                    latencies = time_call(lambda: searches[mode](query), args.runs)
+                    print(f"{rows:>12,} {mode:>6} {query:<18} {hits:>5} "
+                          f"{np.percentile(latencies, 50):>9.2f} {np.percentile(latencies, 99):>9.2f}")
+                session.rollback()
+    finally:
+        loop.close()
+        session.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+End-to-end YOLO throughput benchmark.
+
+Runs detection (without touching the database) over the scraped images once per worker
+count, including process start-up and model loading, and prints images/sec:
+
+    python scripts/benchmark_yolo.py --workers 1 2 4 32 --batch-size 16 --limit 2000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import yolo_detect  # noqa: E402
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Compare YOLO detection throughput across worker counts.")
+    parser.add_argument('--images-dir', default='data/raw/images')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted({1, 2, 4, cpu_count}))
+    parser.add_argument('--batch-size', type=int, default=yolo_detect.YOLO_BATCH_SIZE)
+    parser.add_argument('--torch-threads', type=int, default=yolo_detect.YOLO_TORCH_THREADS,
+                        help="Threads per worker; 0 splits the cores evenly across workers.")
+    parser.add_argument('--limit', type=int, default=0, help="Only use the first N images (0 = all).")
+    args = parser.parse_args()
+
+    images = yolo_detect.list_all_images(args.images_dir)
+    if args.limit:
+        images = images[:args.limit]
+    print(f"Benchmarking {len(images)} images from {args.images_dir} on {cpu_count} cores")
+
+    results = []
+    for workers in args.workers:
+        start = time.perf_counter()
+        count = sum(1 for _ in yolo_detect.iter_detections(
+            images, batch_size=args.batch_size, workers=workers, torch_threads=args.torch_threads
+        ))
+        results.append((workers, count, time.perf_counter() - start))
+
+    print(f"\n{'workers':>8} {'images':>8} {'seconds':>9} {'images/sec':>11} {'speedup':>8}")
+    baseline = results[0][1] / results[0][2] if results and results[0][2] else 0
+    for workers, count, elapsed in results:
+        rate = count / elapsed if elapsed else 0
+        speedup = rate / baseline if baseline else 0
+        print(f"{workers:>8} {count:>8} {elapsed:>9.2f} {rate:>11.1f} {speedup:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+API load test: sync (psycopg2 + threadpool) vs async (asyncpg) database access.
+
+Starts uvicorn once per mode against the configured database, then drives it with
+concurrent httpx clients for a fixed duration and prints requests/sec and latency:
+
+    python scripts/load_test_api.py --modes sync async --concurrency 1 16 64 --duration 15
+
+The response cache is disabled (API_CACHE_ENABLED=0) unless --with-cache is given, so every
+request reaches Postgres. Pool settings come from DB_POOL_SIZE / DB_MAX_OVERFLOW.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUESTS = [
+    ('/api/search/messages', {'query': 'paracetamol', 'limit': 20}),
+    ('/api/search/messages', {'query': 'ዋጋ', 'limit': 20}),
+    ('/api/reports/top-products', {'limit': 10}),
+    ('/api/reports/visual-content', {}),
+]
+
+def start_server(mode, port, with_cache):
+    env = dict(os.environ, API_DB_ASYNC='1' if mode == 'async' else '0')
+    if not with_cache:
+        env['API_CACHE_ENABLED'] = '0'
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn ({mode}) did not start on port {port}")
+
+async def drive(base_url, channels, concurrency, duration):
+    requests = REQUESTS + [(f'/api/channels/{channel}/activity', {}) for channel in channels]
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+
+    async def client_loop(client, rng):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            path, params = rng.choice(requests)
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, params=params)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        await asyncio.gather(*(client_loop(client, random.Random(i)) for i in range(concurrency)))
+    return np.array(latencies) * 1000, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare API throughput with sync and async database access.")
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--duration', type=float, default=15, help="Seconds per concurrency level.")
+    parser.add_argument('--channels', nargs='+', default=['CheMed123', 'lobelia4cosmetics', 'tikvahpharma'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--with-cache', action='store_true', help="Keep the response cache enabled.")
+    args = parser.parse_args()
+
+    results = []
+    for mode in args.modes:
+        server = start_server(mode, args.port, args.with_cache)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            asyncio.run(drive(base_url, args.channels, 4, 2))  # warm-up: pools, plans, caches
+            for concurrency in args.concurrency:
+                latencies, errors = asyncio.run(drive(base_url, args.channels, concurrency, args.duration))
+                results.append((mode, concurrency, latencies, errors))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{'mode':>6} {'clients':>8} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, concurrency, latencies, errors in results:
+        print(f"{mode:>6} {concurrency:>8} {len(latencies):>9} {len(latencies) / args.duration:>8.1f} "
+              f"{np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 99):>8.1f} {errors:>7}")
+
+if __name__ == "__main__":
+    main()
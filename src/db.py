@@ -0,0 +1,202 @@
+import os
+import re
+import logging
+import weakref
+import itertools
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote_plus
+import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
+from dotenv import load_dotenv
+from src import instrumentation
+
+# Load environment variables
+load_dotenv()
+
+# One set of connection settings for the pipeline stages, the scripts and the API
+DB_HOST = os.getenv('DB_HOST', 'localhost')
+DB_PORT = os.getenv('DB_PORT', '5433')
+DB_NAME = os.getenv('DB_NAME', 'medical_db')
+DB_USER = os.getenv('DB_USER', 'sa')
+DB_PASS = os.getenv('DB_PASS', '123')
+
+# Pipeline connection pool (the API's SQLAlchemy engine keeps its own, see api/database.py).
+# connection() waits for a free slot once DB_POOL_MAX connections are checked out.
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '8'))
+# Session settings for bulk stages (loading, YOLO). With synchronous_commit=off a crash can
+# lose the last few hundred milliseconds of commits, never consistency: the load manifest and
+# the detection keys commit together with their rows, so the next run redoes the lost work.
+DB_BULK_SYNCHRONOUS_COMMIT = os.getenv('DB_BULK_SYNCHRONOUS_COMMIT', 'off')
+DB_BULK_WORK_MEM = os.getenv('DB_BULK_WORK_MEM', '')
+# Server-side PREPARE for the hot insert paths; set to 0 behind a transaction-mode pooler
+# (e.g. PgBouncer), which can't keep a prepared statement across transactions
+DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', '1') == '1'
+# Rows fetched per round trip when streaming a large read through a server-side cursor
+DB_CURSOR_ITERSIZE = int(os.getenv('DB_CURSOR_ITERSIZE', '10000'))
+
+_pool = None
+_pool_pid = None
+_slots = None
+_pool_lock = threading.Lock()
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+_cursor_ids = itertools.count()
+
+def connection_params(database=None):
+    """psycopg2.connect() keyword arguments; statements are counted for the stage metrics."""
+    return dict(host=DB_HOST, port=DB_PORT, database=database or DB_NAME, user=DB_USER, password=DB_PASS,
+                cursor_factory=instrumentation.CountingCursor)
+
+def database_url(driver='postgresql', database=None):
+    """SQLAlchemy URL for the same database, e.g. driver='postgresql+asyncpg'."""
+    return (f"{driver}://{quote_plus(DB_USER)}:{quote_plus(DB_PASS)}"
+            f"@{DB_HOST}:{DB_PORT}/{database or DB_NAME}")
+
+def connect_db(database=None):
+    """A dedicated (unpooled) connection, or None if the database is unreachable."""
+    try:
+        return psycopg2.connect(**connection_params(database))
+    except Exception as e:
+        logging.error(f"Error connecting to database: {e}")
+        return None
+
+def bulk_settings():
+    settings = {'synchronous_commit': DB_BULK_SYNCHRONOUS_COMMIT, 'work_mem': DB_BULK_WORK_MEM}
+    return {name: value for name, value in settings.items() if value}
+
+def apply_settings(conn, settings):
+    """Sets session parameters in one round trip and commits."""
+    if not settings:
+        return
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT set_config(name, value, false) FROM unnest(%s::TEXT[], %s::TEXT[]) AS s(name, value)",
+            (list(settings), list(settings.values()))
+        )
+    conn.commit()
+
+def reset_settings(conn, names):
+    if not names:
+        return
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL('; ').join(sql.SQL("RESET {}").format(sql.Identifier(name)) for name in names))
+    conn.commit()
+
+def get_pool():
+    """The process's connection pool, created on first use (and again in forked children)."""
+    global _pool, _pool_pid, _slots
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **connection_params())
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(DB_POOL_MAX)
+        return _pool, _slots
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.closeall()
+        _pool = None
+
+@contextmanager
+def connection(bulk=False):
+    """
+    Checks a pooled connection out for the block, committing on success and rolling back
+    on error. bulk=True applies bulk_settings() for the block and resets them afterwards.
+    Thread-safe: loader and detector workers each take their own connection.
+    """
+    pool, slots = get_pool()
+    slots.acquire()
+    conn = None
+    try:
+        conn = pool.getconn()
+        settings = bulk_settings() if bulk else {}
+        apply_settings(conn, settings)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if not conn.closed:
+                reset_settings(conn, list(settings))
+    finally:
+        if conn is not None:
+            pool.putconn(conn, close=bool(conn.closed))
+        slots.release()
+
+def execute_prepared(cur, name, statement, params):
+    """
+    Runs `statement` (placeholders $1..$n, each used once and in order) as a prepared
+    statement, PREPAREd on the connection's first call, so later calls skip parsing and
+    planning. Falls back to a plain execute when DB_PREPARED_STATEMENTS is off.
+    """
+    if not DB_PREPARED_STATEMENTS:
+        cur.execute(re.sub(r'\$\d+', '%s', statement), params)
+        return
+    with _prepared_lock:
+        names = _prepared.setdefault(cur.connection, set())
+    if name not in names:
+        # PREPARE outlives a rolled-back transaction, so this runs once per connection
+        cur.execute(f"PREPARE {name} AS {statement}")
+        names.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+def unnest_select(columns, types):
+    """
+    SELECT list reading one text[] parameter per column and casting each value, so one
+    prepared statement inserts batches of any size; pair with text_arrays(rows).
+    """
+    casts = ', '.join(f"{column}::{types[column]}" for column in columns)
+    arrays = ', '.join(f"${i}::TEXT[]" for i in range(1, len(columns) + 1))
+    return f"SELECT {casts} FROM unnest({arrays}) AS t({', '.join(columns)})"
+
+def text_arrays(rows, width):
+    """Transposes rows into `width` lists of text values (None stays NULL), as COPY would read them."""
+    columns = [[] for _ in range(width)]
+    for row in rows:
+        for column, value in zip(columns, row):
+            column.append(None if value is None else str(value))
+    return columns
+
+def create_database(name, drop_existing=False):
+    """
+    Creates a (scratch) database on the configured server if it doesn't exist; with
+    drop_existing it is dropped first, so every run starts from the same empty state.
+    """
+    conn = psycopg2.connect(**connection_params('postgres'))
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            if drop_existing:
+                cur.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(name)))
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (name,))
+            if cur.fetchone() is None:
+                cur.execute(sql.SQL("CREATE DATABASE {} ENCODING 'UTF8' TEMPLATE template0").format(sql.Identifier(name)))
+    finally:
+        conn.close()
+
+def column_exists(cur, table, column, schema='raw'):
+    """Checks the catalog first, so migrations only ALTER (and lock) a table when a column is missing."""
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s;
+    """, (schema, table, column))
+    return cur.fetchone() is not None
+
+def stream(conn, query, params=None, itersize=DB_CURSOR_ITERSIZE):
+    """
+    Yields the rows of a large read through a server-side cursor, `itersize` rows per
+    round trip, so memory stays flat however many rows match. Must run in a transaction
+    (not autocommit); close the generator to release the cursor early.
+    """
+    with conn.cursor(name=f"stream_{next(_cursor_ids)}") as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        yield from cur
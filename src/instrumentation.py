@@ -0,0 +1,266 @@
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import psycopg2.extensions
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Load environment variables
+load_dotenv()
+
+# Every pipeline stage (scrape, load, yolo, dbt) appends one JSON event per run to
+# METRICS_FILE, which is rotated to METRICS_FILE.1 past METRICS_MAX_BYTES. The latest event
+# and run counts per stage and label set are kept in SNAPSHOT_FILE; PROMETHEUS_FILE is
+# rendered from that snapshot for node_exporter's textfile collector, and the API serves
+# the same text at /metrics. Relative paths are anchored to the repository root, so stages
+# that change directory (e.g. the YOLO benchmark) still write to the same files.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+METRICS_FILE = os.path.join(ROOT, os.getenv('METRICS_FILE', 'logs/metrics.jsonl'))
+METRICS_MAX_BYTES = int(os.getenv('METRICS_MAX_BYTES', str(10 * 1024 * 1024)))
+SNAPSHOT_FILE = os.path.join(ROOT, os.getenv('METRICS_SNAPSHOT_FILE', 'logs/metrics_latest.json'))
+PROMETHEUS_FILE = os.path.join(ROOT, os.getenv('PROMETHEUS_FILE', 'logs/metrics.prom'))
+METRIC_PREFIX = 'medical_pipeline_stage'
+
+_lock = threading.Lock()
+_round_trips = 0
+_last_events = {}
+
+class CountingCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor that counts statements sent to the server (pass as cursor_factory)."""
+
+    def execute(self, query, vars=None):
+        count_round_trip()
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        count_round_trip()
+        return super().executemany(query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        count_round_trip()
+        return super().copy_expert(sql, file, size)
+
+def count_round_trip(count=1):
+    global _round_trips
+    with _lock:
+        _round_trips += count
+
+def round_trips():
+    with _lock:
+        return _round_trips
+
+def peak_rss_bytes():
+    """Peak resident set size of this process or its largest finished child (e.g. inference workers)."""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class Stage:
+    """
+    A running pipeline stage: times it from creation and counts its work (rows, images,
+    bytes, ...). finish() records wall time, the counts, DB round trips and peak RSS as one
+    event in METRICS_FILE.
+    """
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = {key: str(value) for key, value in labels.items()}
+        self.counts = {}
+        self.status = 'ok'
+        self.start = time.perf_counter()
+        self.round_trips = round_trips()
+
+    def add(self, counter, value=1):
+        self.counts[counter] = self.counts.get(counter, 0) + value
+
+    def fail(self):
+        self.status = 'error'
+
+    def finish(self):
+        event = {
+            'stage': self.name,
+            'labels': self.labels,
+            'status': self.status,
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'seconds': round(time.perf_counter() - self.start, 3),
+            'counts': self.counts,
+            'db_round_trips': round_trips() - self.round_trips,
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+        record(event)
+        return event
+
+def start(name, **labels):
+    """Starts timing a stage; call .finish() on every way out of it."""
+    return Stage(name, labels)
+
+@contextmanager
+def stage(name, **labels):
+    """Times the block as a stage; an exception escaping it marks the stage failed."""
+    current = Stage(name, labels)
+    try:
+        yield current
+    except BaseException:
+        current.fail()
+        raise
+    finally:
+        current.finish()
+
+def record(event):
+    with _lock:
+        _last_events[event['stage']] = event
+    try:
+        for path in (METRICS_FILE, SNAPSHOT_FILE):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with _file_lock():
+            _append_history(event)
+            write_prometheus(snapshot=update_snapshot(event))
+    except OSError as e:
+        logging.error(f"Could not record metrics for stage {event['stage']}: {e}")
+
+@contextmanager
+def _file_lock():
+    """Serialises snapshot updates across the stage processes sharing the metrics directory."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{SNAPSHOT_FILE}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _append_history(event):
+    # One short append per event, so concurrent stage processes don't interleave lines
+    if os.path.exists(METRICS_FILE) and os.path.getsize(METRICS_FILE) >= METRICS_MAX_BYTES:
+        os.replace(METRICS_FILE, f"{METRICS_FILE}.1")
+    with open(METRICS_FILE, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(event) + '\n')
+
+def _write_atomic(path, content):
+    """Writes via a temp file and rename, so a reader never sees half of it."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def read_snapshot(path=None):
+    """
+    Latest state per stage and label set: {key: {'labels', 'runs': {status: n}, 'latest'}}.
+    Its size depends on the stages and labels seen, not on how many runs were recorded.
+    """
+    path = path or SNAPSHOT_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        logging.warning(f"Ignoring unreadable metrics snapshot {path}")
+        return {}
+
+def update_snapshot(event, path=None):
+    """Folds one event into the snapshot and rewrites it atomically; returns the new snapshot."""
+    path = path or SNAPSHOT_FILE
+    snapshot = read_snapshot(path)
+    labels = {'stage': event['stage'], **event.get('labels', {})}
+    key = json.dumps(sorted(labels.items()))
+    entry = snapshot.setdefault(key, {'labels': labels, 'runs': {}, 'latest': None})
+    entry['runs'][event['status']] = entry['runs'].get(event['status'], 0) + 1
+    entry['latest'] = event
+    _write_atomic(path, json.dumps(snapshot))
+    return snapshot
+
+def last_event(name):
+    """The most recent event recorded for a stage in this process, or None."""
+    with _lock:
+        return _last_events.get(name)
+
+def read_events(path=None):
+    """Events recorded since METRICS_FILE was last rotated (history only; /metrics uses the snapshot)."""
+    path = path or METRICS_FILE
+    if not os.path.exists(path):
+        return []
+    events = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # a line cut off by a crash
+    return events
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(values):
+    return ','.join(f'{key}="{_escape(value)}"' for key, value in values.items())
+
+def render_prometheus(snapshot):
+    """
+    Prometheus text exposition of the snapshot: run totals per stage and status, and the
+    latest run's duration, counters, round trips and peak RSS per stage and label set.
+    """
+    runs, latest = {}, {}
+    for entry in snapshot.values():
+        labels = entry['labels']
+        key = tuple(sorted(labels.items()))
+        for status, count in entry['runs'].items():
+            runs[key + (('status', status),)] = count
+        latest[key] = (labels, entry['latest'])
+
+    lines = [
+        f"# HELP {METRIC_PREFIX}_runs_total Stage runs recorded, by outcome.",
+        f"# TYPE {METRIC_PREFIX}_runs_total counter",
+    ]
+    lines += [f"{METRIC_PREFIX}_runs_total{{{_labels(dict(key))}}} {count}" for key, count in sorted(runs.items())]
+
+    gauges = [
+        ('duration_seconds', "Wall time of the latest run.", lambda e: [({}, e['seconds'])]),
+        ('processed', "Work counted by the latest run, by unit (rows, images, bytes, ...).",
+         lambda e: [({'unit': unit}, value) for unit, value in sorted(e.get('counts', {}).items())]),
+        ('db_round_trips', "Statements sent to Postgres by the latest run.", lambda e: [({}, e['db_round_trips'])]),
+        ('peak_rss_bytes', "Peak RSS of the process by the end of the latest run.",
+         lambda e: [({}, e['peak_rss_bytes'])] if e.get('peak_rss_bytes') is not None else []),
+        ('last_run_timestamp_seconds', "When the latest run finished.",
+         lambda e: [({'status': e['status']}, datetime.fromisoformat(e['finished_at']).timestamp())]),
+    ]
+    for suffix, description, samples in gauges:
+        lines += [f"# HELP {METRIC_PREFIX}_{suffix} {description}", f"# TYPE {METRIC_PREFIX}_{suffix} gauge"]
+        for _, (labels, event) in sorted(latest.items()):
+            for extra, value in samples(event):
+                lines.append(f"{METRIC_PREFIX}_{suffix}{{{_labels({**labels, **extra})}}} {value}")
+    return '\n'.join(lines) + '\n'
+
+def write_prometheus(path=None, snapshot=None):
+    """Rewrites the textfile atomically from the snapshot, so a scraper never reads half of it."""
+    snapshot = read_snapshot() if snapshot is None else snapshot
+    _write_atomic(path or PROMETHEUS_FILE, render_prometheus(snapshot))
+
+def dagster_metadata(event):
+    """Flattens an event into Dagster asset materialization metadata."""
+    if event is None:
+        return {}
+    metadata = {'seconds': event['seconds'], 'db_round_trips': event['db_round_trips'], **event['counts']}
+    if event.get('peak_rss_bytes') is not None:
+        metadata['peak_rss_mb'] = round(event['peak_rss_bytes'] / 1e6, 1)
+    return metadata
@@ -1,47 +1,88 @@
 import os
+import re
+import io
+import gzip
 import json
+import time
+import uuid
+import hashlib
 import logging
+import argparse
 import psycopg2
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 from psycopg2 import sql
 from dotenv import load_dotenv
+from src import db, instrumentation
 
 # Load environment variables
 load_dotenv()
 
-DB_HOST = os.getenv('DB_HOST', 'localhost')
-DB_PORT = os.getenv('DB_PORT', '5433')
-DB_NAME = os.getenv('DB_NAME', 'medical_db')
-DB_USER = os.getenv('DB_USER', 'user')
-DB_PASS = os.getenv('DB_PASS', 'password')
+# Bulk load settings
+LOAD_BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', '10000'))
+LOAD_METHOD = os.getenv('LOAD_METHOD', 'copy')  # 'copy' or 'values'
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', '1'))
+
+BASE_DIR = 'data/raw/telegram_messages'
+STAGING_TABLE = 'raw.telegram_messages_staging'
+DEFAULT_PARTITION = 'raw.telegram_messages_default'
+# Unpartitioned table from older versions, renamed while its rows are migrated
+LEGACY_TABLE = 'raw.telegram_messages_legacy'
+
+# Scraper output: NDJSON (optionally gzipped) plus legacy indented JSON arrays
+MESSAGE_FILE_SUFFIXES = ('.jsonl', '.jsonl.gz', '.json')
+
+MESSAGE_COLUMNS = (
+    'message_id', 'channel_name', 'message_date', 'message_text',
+    'has_media', 'image_path', 'views', 'forwards'
+)
+
+# Staged rows also carry the file's position in load order, so the merge
+# keeps the copy from the newest file even when files are staged in parallel,
+# and the id of the load that staged them, so concurrent loads (e.g. Dagster
+# partitions backfilled side by side) only ever merge and clear their own rows.
+STAGING_COLUMNS = MESSAGE_COLUMNS + ('file_rank', 'run_id')
+STAGING_TYPES = {
+    'message_id': 'INTEGER', 'channel_name': 'TEXT', 'message_date': 'TIMESTAMP', 'message_text': 'TEXT',
+    'has_media': 'BOOLEAN', 'image_path': 'TEXT', 'views': 'INTEGER', 'forwards': 'INTEGER', 'file_rank': 'INTEGER',
+    'run_id': 'TEXT',
+}
+# Staged rows left behind by a load that was killed are cleared after this long
+STAGING_MAX_AGE_HOURS = int(os.getenv('LOAD_STAGING_MAX_AGE_HOURS', '24'))
+# Merges into raw.telegram_messages (and the partitions they create) take this
+# transaction-level advisory lock, so concurrent loads merge one at a time
+MERGE_LOCK_KEY = 0x72617731  # 'raw1'
 
 # Set up logging
+os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
     filename='logs/loading.log',
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def connect_db():
-    try:
-        conn = psycopg2.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            database=DB_NAME,
-            user=DB_USER,
-            password=DB_PASS
-        )
-        return conn
-    except Exception as e:
-        logging.error(f"Error connecting to database: {e}")
-        return None
-
 def create_raw_schema(conn):
     try:
         with conn.cursor() as cur:
+            # Concurrent loads run this too; serialise its DDL with their merges
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (MERGE_LOCK_KEY,))
             cur.execute("CREATE SCHEMA IF NOT EXISTS raw;")
+            cur.execute("""
+                SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'raw' AND c.relname = 'telegram_messages';
+            """)
+            row = cur.fetchone()
+            legacy = row is not None and row[0] == 'r'
+            if legacy:
+                detach_legacy_table(cur)
+
+            # Range-partitioned by month on message_date. Unique keys on a partitioned
+            # table must include the partition key, so the natural key is
+            # (channel_name, message_id, message_date) (a message's date never changes)
+            # and id, still unique through its sequence, is no longer a primary key.
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS raw.telegram_messages (
-                    id SERIAL PRIMARY KEY,
+                    id SERIAL,
                     message_id INTEGER,
                     channel_name TEXT,
                     message_date TIMESTAMP,
@@ -49,7 +90,82 @@ def create_raw_schema(conn):
                     has_media BOOLEAN,
                     image_path TEXT,
                     views INTEGER,
-                    forwards INTEGER
+                    forwards INTEGER,
+                    CONSTRAINT telegram_messages_channel_message_key UNIQUE (channel_name, message_id, message_date)
+                ) PARTITION BY RANGE (message_date);
+            """)
+            # Catches rows for months without a partition (and NULL dates) until ensure_partitions moves them
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION}
+                PARTITION OF raw.telegram_messages DEFAULT;
+            """)
+            # Watermarks for the incremental marts: posting time, and load order (id)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS telegram_messages_message_date_idx
+                ON raw.telegram_messages (message_date);
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS telegram_messages_id_idx
+                ON raw.telegram_messages (id);
+            """)
+            this_month = date.today().replace(day=1)
+            ensure_partitions(cur, [this_month, add_months(this_month, 1)])
+            if legacy:
+                copy_legacy_table(cur)
+
+            # Search is served from the fct_messages mart, which indexes its own tsvector;
+            # drop the raw-table copy older versions maintained on every load. Checked first,
+            # since ALTER TABLE locks the partitioned table exclusively even when there is nothing to drop
+            if db.column_exists(cur, 'telegram_messages', 'search_vector'):
+                cur.execute("ALTER TABLE raw.telegram_messages DROP COLUMN search_vector;")
+            cur.execute("DROP INDEX IF EXISTS raw.telegram_messages_text_trgm_idx;")
+            # pg_trgm enables fuzzy search; the mart builds its trigram index only when present
+            cur.execute("SAVEPOINT trgm;")
+            try:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+                cur.execute("RELEASE SAVEPOINT trgm;")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT trgm;")
+                logging.warning(f"pg_trgm unavailable, fuzzy search disabled: {e}")
+
+            # Scratch table each file is copied into before being merged
+            cur.execute(f"""
+                CREATE UNLOGGED TABLE IF NOT EXISTS {STAGING_TABLE} (
+                    seq BIGSERIAL,
+                    message_id INTEGER,
+                    channel_name TEXT,
+                    message_date TIMESTAMP,
+                    message_text TEXT,
+                    has_media BOOLEAN,
+                    image_path TEXT,
+                    views INTEGER,
+                    forwards INTEGER,
+                    file_rank INTEGER DEFAULT 0,
+                    run_id TEXT,
+                    staged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            # Columns added since the first version; altered only when missing, since the
+            # ALTER would otherwise block concurrent loads staging into the table
+            staging_columns = {
+                'file_rank': 'INTEGER DEFAULT 0',
+                'run_id': 'TEXT',
+                'staged_at': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+            }
+            for column, definition in staging_columns.items():
+                if not db.column_exists(cur, 'telegram_messages_staging', column):
+                    cur.execute(f"ALTER TABLE {STAGING_TABLE} ADD COLUMN {column} {definition};")
+            cur.execute(f"CREATE INDEX IF NOT EXISTS telegram_messages_staging_run_idx ON {STAGING_TABLE} (run_id);")
+
+            # One row per loaded JSON file so unchanged files can be skipped
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS raw.load_manifest (
+                    file_path TEXT PRIMARY KEY,
+                    file_size BIGINT,
+                    file_mtime DOUBLE PRECISION,
+                    content_hash TEXT,
+                    row_count INTEGER,
+                    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
             """)
             conn.commit()
@@ -58,47 +174,411 @@ def create_raw_schema(conn):
         logging.error(f"Error creating schema: {e}")
         conn.rollback()
 
-def load_data(conn):
-    base_dir = 'data/raw/telegram_messages'
+def partition_name(month):
+    return f"raw.telegram_messages_y{month:%Y}m{month:%m}"
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+def ensure_partitions(cur, months):
+    """
+    Creates the monthly partitions of raw.telegram_messages covering `months` (dates or
+    datetimes in each month) that don't exist yet. Rows already sitting in the default
+    partition for such a month are moved into the new partition before it is attached.
+    """
+    cur.execute("""
+        SELECT n.nspname || '.' || c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE i.inhparent = 'raw.telegram_messages'::regclass
+    """)
+    existing = {row[0] for row in cur.fetchall()}
+    created = 0
+    for month in sorted({date(m.year, m.month, 1) for m in months}):
+        name = partition_name(month)
+        if name in existing:
+            continue
+        bounds = (month, add_months(month, 1))
+        cur.execute(f"CREATE TABLE {name} (LIKE raw.telegram_messages INCLUDING DEFAULTS);")
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE message_date >= %s AND message_date < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved;
+        """, bounds)
+        # Attaching builds the partition's copies of the parent's indexes
+        cur.execute(f"ALTER TABLE raw.telegram_messages ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s);",
+                    bounds)
+        existing.add(name)
+        created += 1
+    if created:
+        logging.info(f"Created {created} monthly partitions of raw.telegram_messages.")
+    return created
+
+def detach_legacy_table(cur):
+    """
+    Renames an unpartitioned raw.telegram_messages (and its sequence and key names) out of
+    the way so the partitioned table can be created; copy_legacy_table moves its rows over.
+    """
+    logging.info("Migrating raw.telegram_messages to a monthly partitioned table.")
+    cur.execute(f"ALTER TABLE raw.telegram_messages RENAME TO {LEGACY_TABLE.split('.')[1]};")
+    cur.execute("ALTER SEQUENCE IF EXISTS raw.telegram_messages_id_seq RENAME TO telegram_messages_legacy_id_seq;")
+    cur.execute(f"ALTER TABLE {LEGACY_TABLE} DROP CONSTRAINT IF EXISTS telegram_messages_pkey;")
+    cur.execute("DROP INDEX IF EXISTS raw.telegram_messages_channel_message_key;")
+    cur.execute("DROP INDEX IF EXISTS raw.telegram_messages_message_date_idx;")
+
+def copy_legacy_table(cur):
+    """Copies the renamed legacy rows (keeping their ids, newest duplicate wins) and drops the old table."""
+    cur.execute(f"SELECT DISTINCT date_trunc('month', message_date) FROM {LEGACY_TABLE} WHERE message_date IS NOT NULL;")
+    ensure_partitions(cur, [row[0] for row in cur.fetchall()])
+    columns = ', '.join(('id',) + MESSAGE_COLUMNS)
+    cur.execute(f"""
+        INSERT INTO raw.telegram_messages ({columns})
+        SELECT DISTINCT ON (channel_name, message_id) {columns}
+        FROM {LEGACY_TABLE}
+        ORDER BY channel_name, message_id, id DESC;
+    """)
+    copied = cur.rowcount
+    cur.execute("""
+        SELECT setval(pg_get_serial_sequence('raw.telegram_messages', 'id'),
+                      GREATEST((SELECT max(id) FROM raw.telegram_messages), 1));
+    """)
+    # Views built on the old table (dbt's staging models) go too; the next dbt run recreates them
+    cur.execute(f"DROP TABLE {LEGACY_TABLE} CASCADE;")
+    logging.info(f"Copied {copied} rows into the partitioned raw.telegram_messages; run dbt to recreate its views.")
+
+def list_message_files(base_dir=BASE_DIR):
+    """Returns (manifest_key, path) for every scraped JSON file, oldest date folder first."""
+    files = []
+    for date_folder in sorted(os.listdir(base_dir)):
+        date_path = os.path.join(base_dir, date_folder)
+        if not os.path.isdir(date_path):
+            continue
+        for json_file in sorted(os.listdir(date_path)):
+            if json_file.endswith(MESSAGE_FILE_SUFFIXES):
+                files.append((f"{date_folder}/{json_file}", os.path.join(date_path, json_file)))
+    return files
+
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+_WHITESPACE = re.compile(r'\s*')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    Incrementally decodes the elements of a top-level JSON array, so only one
+    element plus one read chunk is held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    while not buffer.strip() and not eof:
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+    buffer = buffer.lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Expected a JSON array")
+    pos = 1
+
+    while True:
+        pos = _SEPARATORS.match(buffer, pos).end()
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+            # Only trust an element once its ',' or ']' is in the buffer;
+            # a number cut at the chunk edge ("12" of "125") decodes fine otherwise.
+            next_pos = _WHITESPACE.match(buffer, end).end()
+            complete = next_pos < len(buffer) and buffer[next_pos] in ',]'
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if complete:
+            yield obj
+            pos = end
+            continue
+        if eof:
+            raise ValueError("Unterminated JSON array")
+
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+def iter_file_messages(file_path):
+    """Yields one row tuple (in MESSAGE_COLUMNS order) per message, streaming the file."""
+    if file_path.endswith('.gz'):
+        f = gzip.open(file_path, 'rt', encoding='utf-8')
+    else:
+        f = open(file_path, 'r', encoding='utf-8')
+
+    with f:
+        if file_path.endswith('.json'):
+            messages = iter_json_array(f)
+        else:
+            messages = (json.loads(line) for line in f if line.strip())
+        for msg in messages:
+            yield tuple(msg.get(col) for col in MESSAGE_COLUMNS)
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# COPY's text format: backslash escapes for the delimiter and line breaks, \N for NULL
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def copy_value(value):
+    """One field in COPY text format; keeps '' distinct from NULL."""
+    if value is None:
+        return '\\N'
+    return str(value).translate(COPY_ESCAPES)
+
+def copy_rows(cur, rows, table=STAGING_TABLE, columns=STAGING_COLUMNS):
+    """Streams a batch of rows into the table with a single COPY FROM STDIN."""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(map(copy_value, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+def insert_rows(cur, rows, table=STAGING_TABLE, columns=STAGING_COLUMNS):
+    """
+    Fallback for servers/poolers without COPY support: one prepared INSERT per batch,
+    taking each column as an array, so every batch reuses the same plan.
+    """
+    db.execute_prepared(
+        cur,
+        f"insert_{table.replace('.', '_')}",
+        f"INSERT INTO {table} ({', '.join(columns)}) {db.unnest_select(columns, STAGING_TYPES)}",
+        db.text_arrays(rows, len(columns))
+    )
+
+def stage_file(cur, file_path, file_rank, run_id, batch_size, method):
+    """Copies one file into the staging table under run_id, in batches; returns the row count."""
+    write_batch = copy_rows if method == 'copy' else insert_rows
+    rows = (row + (file_rank, run_id) for row in iter_file_messages(file_path))
+    staged = 0
+    for batch in iter_batches(rows, batch_size):
+        write_batch(cur, batch)
+        staged += len(batch)
+    return staged
+
+def clear_staging(cur, run_id):
+    cur.execute(f"DELETE FROM {STAGING_TABLE} WHERE run_id = %s", (run_id,))
+
+def merge_staging(cur, run_id):
+    """
+    Upserts the rows run_id staged into raw.telegram_messages on (channel_name, message_id,
+    message_date), creating any monthly partitions they need first. The copy from the
+    newest file wins, and unchanged rows are not rewritten. Holds the merge advisory lock
+    until the caller's transaction ends.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (MERGE_LOCK_KEY,))
+    cur.execute(f"""
+        SELECT DISTINCT date_trunc('month', message_date) FROM {STAGING_TABLE}
+        WHERE run_id = %s AND message_date IS NOT NULL
+    """, (run_id,))
+    ensure_partitions(cur, [row[0] for row in cur.fetchall()])
+    columns = ', '.join(MESSAGE_COLUMNS)
+    cur.execute(f"""
+        INSERT INTO raw.telegram_messages ({columns})
+        SELECT DISTINCT ON (channel_name, message_id) {columns}
+        FROM {STAGING_TABLE}
+        WHERE run_id = %s
+        ORDER BY channel_name, message_id, file_rank DESC, seq DESC
+        ON CONFLICT (channel_name, message_id, message_date) DO UPDATE SET
+            message_text = EXCLUDED.message_text,
+            has_media = EXCLUDED.has_media,
+            image_path = COALESCE(EXCLUDED.image_path, telegram_messages.image_path),
+            views = EXCLUDED.views,
+            forwards = EXCLUDED.forwards
+        WHERE (telegram_messages.message_text, telegram_messages.views, telegram_messages.forwards,
+               telegram_messages.image_path)
+              IS DISTINCT FROM
+              (EXCLUDED.message_text, EXCLUDED.views, EXCLUDED.forwards,
+               COALESCE(EXCLUDED.image_path, telegram_messages.image_path))
+    """, (run_id,))
+    return cur.rowcount
+
+def fetch_manifest(cur):
+    cur.execute("SELECT file_path, file_size, file_mtime, content_hash FROM raw.load_manifest")
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+def record_manifest(cur, manifest_key, size, mtime, content_hash, row_count):
+    cur.execute("""
+        INSERT INTO raw.load_manifest (file_path, file_size, file_mtime, content_hash, row_count)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (file_path) DO UPDATE SET
+            file_size = EXCLUDED.file_size,
+            file_mtime = EXCLUDED.file_mtime,
+            content_hash = EXCLUDED.content_hash,
+            row_count = COALESCE(EXCLUDED.row_count, load_manifest.row_count),
+            loaded_at = CURRENT_TIMESTAMP
+    """, (manifest_key, size, mtime, content_hash, row_count))
+
+def pending_files(cur, files, full_refresh):
+    """
+    Returns (rank, manifest_key, path, size, mtime, known_hash) for every file whose
+    size/mtime differ from raw.load_manifest (all files when full_refresh is set).
+    """
+    manifest = {} if full_refresh else fetch_manifest(cur)
+    pending = []
+    for rank, (manifest_key, file_path) in enumerate(files):
+        stat = os.stat(file_path)
+        known = manifest.get(manifest_key)
+        if known and (known[0], known[1]) == (stat.st_size, stat.st_mtime):
+            continue
+        pending.append((rank, manifest_key, file_path, stat.st_size, stat.st_mtime, known[2] if known else None))
+    return pending
+
+def load_data(conn, batch_size=LOAD_BATCH_SIZE, method=LOAD_METHOD, full_refresh=False,
+              workers=LOAD_WORKERS, base_dir=BASE_DIR, only=None):
+    """
+    Loads new or changed scraped files into raw.telegram_messages.
+    Files whose size/mtime (or, failing that, content hash) match raw.load_manifest
+    are skipped unless full_refresh is set. With workers=1 each file commits together
+    with its manifest entry, so an interrupted run resumes at the first unloaded file;
+    with workers>1 files are staged concurrently and merged in one transaction.
+    Each call stages under its own run id, so concurrent loads are safe.
+    `only` restricts the load to these manifest keys ("<date>/<file name>").
+    """
     if not os.path.exists(base_dir):
         logging.warning("No telegram_messages directory found.")
         return
 
+    start = time.perf_counter()
+    metrics = instrumentation.start('load')
+    run_id = uuid.uuid4().hex
     try:
         with conn.cursor() as cur:
-            for date_folder in os.listdir(base_dir):
-                date_path = os.path.join(base_dir, date_folder)
-                if os.path.isdir(date_path):
-                    for json_file in os.listdir(date_path):
-                        if json_file.endswith('.json'):
-                            file_path = os.path.join(date_path, json_file)
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                messages = json.load(f)
-                                for msg in messages:
-                                    cur.execute("""
-                                        INSERT INTO raw.telegram_messages (
-                                            message_id, channel_name, message_date, 
-                                            message_text, has_media, image_path, views, forwards
-                                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                                    """, (
-                                        msg.get('message_id'),
-                                        msg.get('channel_name'),
-                                        msg.get('message_date'),
-                                        msg.get('message_text'),
-                                        msg.get('has_media'),
-                                        msg.get('image_path'),
-                                        msg.get('views'),
-                                        msg.get('forwards')
-                                    ))
+            cur.execute(
+                f"DELETE FROM {STAGING_TABLE} WHERE staged_at < CURRENT_TIMESTAMP - make_interval(hours => %s)",
+                (STAGING_MAX_AGE_HOURS,)
+            )
             conn.commit()
-            logging.info("Data loaded successfully into raw.telegram_messages.")
+            files = list_message_files(base_dir)
+            if only is not None:
+                files = [entry for entry in files if entry[0] in only]
+            pending = pending_files(cur, files, full_refresh)
+
+        if workers > 1 and len(pending) > 1:
+            stats = _load_parallel(conn, pending, run_id, batch_size, method, workers)
+        else:
+            stats = _load_sequential(conn, pending, run_id, batch_size, method)
+
+        total_rows, merged_rows, loaded_files = stats
+        skipped_files = len(files) - loaded_files
+        metrics.add('rows', total_rows)
+        metrics.add('rows_merged', merged_rows)
+        metrics.add('files', loaded_files)
+        metrics.add('bytes', sum(entry[3] for entry in pending))
+        elapsed = time.perf_counter() - start
+        rate = total_rows / elapsed if elapsed > 0 else 0.0
+        logging.info(
+            f"Loaded {total_rows} rows from {loaded_files} files ({skipped_files} unchanged, skipped) "
+            f"via {method} with {workers} worker(s) in {elapsed:.2f}s ({rate:,.0f} rows/sec); "
+            f"{merged_rows} rows inserted or updated."
+        )
+        print(
+            f"Loaded {total_rows} rows from {loaded_files} files in {elapsed:.2f}s "
+            f"({rate:,.0f} rows/sec); skipped {skipped_files} unchanged files."
+        )
+        return total_rows
     except Exception as e:
         logging.error(f"Error loading data: {e}")
         conn.rollback()
+        metrics.fail()
+    finally:
+        metrics.finish()
+
+def _load_sequential(conn, pending, run_id, batch_size, method):
+    total_rows = merged_rows = loaded_files = 0
+    with conn.cursor() as cur:
+        for rank, manifest_key, file_path, size, mtime, known_hash in pending:
+            content_hash = file_hash(file_path)
+            if content_hash == known_hash:
+                # Touched but not changed: refresh size/mtime so the hash isn't recomputed next run
+                record_manifest(cur, manifest_key, size, mtime, content_hash, None)
+                conn.commit()
+                continue
+
+            file_rows = stage_file(cur, file_path, rank, run_id, batch_size, method)
+            merged_rows += merge_staging(cur, run_id)
+            clear_staging(cur, run_id)
+            record_manifest(cur, manifest_key, size, mtime, content_hash, file_rows)
+            conn.commit()
+
+            total_rows += file_rows
+            loaded_files += 1
+    return total_rows, merged_rows, loaded_files
+
+def _load_parallel(conn, pending, run_id, batch_size, method, workers):
+    """
+    Stages files concurrently, one pooled connection per worker (at most DB_POOL_MAX at
+    once), then merges once.
+    """
+    def stage(entry):
+        rank, manifest_key, file_path, size, mtime, known_hash = entry
+        content_hash = file_hash(file_path)
+        if content_hash == known_hash:
+            return manifest_key, size, mtime, content_hash, None
+        with db.connection(bulk=True) as worker_conn:
+            with worker_conn.cursor() as cur:
+                file_rows = stage_file(cur, file_path, rank, run_id, batch_size, method)
+        return manifest_key, size, mtime, content_hash, file_rows
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            staged = list(executor.map(stage, pending))
+    except Exception:
+        with conn.cursor() as cur:
+            clear_staging(cur, run_id)
+        conn.commit()
+        raise
+
+    total_rows = sum(entry[4] or 0 for entry in staged)
+    loaded_files = sum(1 for entry in staged if entry[4] is not None)
+    with conn.cursor() as cur:
+        merged_rows = merge_staging(cur, run_id)
+        for manifest_key, size, mtime, content_hash, file_rows in staged:
+            record_manifest(cur, manifest_key, size, mtime, content_hash, file_rows)
+        clear_staging(cur, run_id)
+    conn.commit()
+    return total_rows, merged_rows, loaded_files
 
 if __name__ == "__main__":
-    connection = connect_db()
+    parser = argparse.ArgumentParser(description="Load scraped Telegram JSON into raw.telegram_messages.")
+    parser.add_argument('--batch-size', type=int, default=LOAD_BATCH_SIZE, help="Rows per COPY/INSERT batch.")
+    parser.add_argument('--method', choices=['copy', 'values'], default=LOAD_METHOD,
+                        help="'copy' streams via COPY FROM STDIN; 'values' uses prepared INSERT batches.")
+    parser.add_argument('--full-refresh', action='store_true',
+                        help="Reload every file, ignoring raw.load_manifest.")
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS,
+                        help="Files staged concurrently, each on its own pooled connection.")
+    args = parser.parse_args()
+
+    connection = db.connect_db()
     if connection:
+        db.apply_settings(connection, db.bulk_settings())
         create_raw_schema(connection)
-        load_data(connection)
+        load_data(connection, batch_size=args.batch_size, method=args.method, full_refresh=args.full_refresh,
+                  workers=args.workers)
         connection.close()
@@ -0,0 +1,135 @@
+import os
+import shutil
+import sqlite3
+import hashlib
+import logging
+import argparse
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Content-addressed image store: every distinct image is kept once as
+# <root>/<sha256[:2]>/<sha256>.jpg, and a SQLite index maps Telegram photo ids and
+# (channel, message_id) pairs to those hashes, so reposted photos cost no disk.
+MEDIA_STORE_DIR = os.getenv('MEDIA_STORE_DIR', 'data/raw/media')
+INDEX_FILE = 'index.sqlite'
+
+def open_index(root=MEDIA_STORE_DIR):
+    """Opens (creating if needed) the SQLite index of the media store under `root`."""
+    os.makedirs(os.path.join(root, 'tmp'), exist_ok=True)
+    index = sqlite3.connect(os.path.join(root, INDEX_FILE))
+    index.execute("PRAGMA journal_mode=WAL")
+    index.execute("PRAGMA synchronous=NORMAL")
+    index.executescript("""
+        CREATE TABLE IF NOT EXISTS photos (
+            photo_id INTEGER PRIMARY KEY,
+            sha256 TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS messages (
+            channel_name TEXT NOT NULL,
+            message_id INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            PRIMARY KEY (channel_name, message_id)
+        );
+        CREATE INDEX IF NOT EXISTS messages_sha256_idx ON messages (sha256);
+    """)
+    return index
+
+def blob_path(sha256, root=MEDIA_STORE_DIR):
+    return os.path.join(root, sha256[:2], f"{sha256}.jpg")
+
+def temp_path(name, root=MEDIA_STORE_DIR):
+    """Download target inside the store, so adding it is a same-filesystem rename."""
+    return os.path.join(root, 'tmp', f"{name}.part")
+
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def lookup_photo(index, photo_id, root=MEDIA_STORE_DIR):
+    """Returns the hash stored for a Telegram photo id, or None if unknown or its file is missing."""
+    row = index.execute("SELECT sha256 FROM photos WHERE photo_id = ?", (photo_id,)).fetchone()
+    if row and os.path.exists(blob_path(row[0], root)):
+        return row[0]
+    return None
+
+def add_file(index, source_path, photo_id=None, root=MEDIA_STORE_DIR):
+    """
+    Moves a downloaded file into the store and returns (sha256, is_new). If the content
+    is already stored the file is discarded instead.
+    """
+    sha256 = file_hash(source_path)
+    target = blob_path(sha256, root)
+    is_new = not os.path.exists(target)
+    if is_new:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source_path, target)
+    else:
+        os.remove(source_path)
+    if photo_id is not None:
+        index.execute("INSERT OR REPLACE INTO photos (photo_id, sha256) VALUES (?, ?)", (photo_id, sha256))
+        index.commit()
+    return sha256, is_new
+
+def link_message(index, channel_name, message_id, sha256):
+    index.execute(
+        "INSERT OR REPLACE INTO messages (channel_name, message_id, sha256) VALUES (?, ?, ?)",
+        (channel_name, message_id, sha256)
+    )
+    index.commit()
+
+def list_media(index, root=MEDIA_STORE_DIR):
+    """Returns (channel, message_id, image_path, sha256) for every message linked to a stored image."""
+    rows = index.execute(
+        "SELECT channel_name, message_id, sha256 FROM messages ORDER BY channel_name, message_id"
+    ).fetchall()
+    return [(channel, str(message_id), blob_path(sha256, root), sha256) for channel, message_id, sha256 in rows]
+
+def import_legacy(index, base_dir='data/raw/images', root=MEDIA_STORE_DIR):
+    """
+    Copies images saved as <base_dir>/<channel>/<message_id>.jpg into the store and links
+    them, so older scrapes deduplicate too. The originals are left in place.
+    """
+    imported = 0
+    if not os.path.exists(base_dir):
+        return imported
+    for channel in sorted(os.listdir(base_dir)):
+        channel_path = os.path.join(base_dir, channel)
+        if not os.path.isdir(channel_path):
+            continue
+        for img_file in sorted(os.listdir(channel_path)):
+            message_id = img_file.split('.')[0]
+            if not message_id.isdigit():
+                continue
+            source = os.path.join(channel_path, img_file)
+            sha256 = file_hash(source)
+            target = blob_path(sha256, root)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(source, target)
+            link_message(index, channel, int(message_id), sha256)
+            imported += 1
+    logging.info(f"Imported {imported} legacy images from {base_dir} into {root}")
+    return imported
+
+def store_stats(index):
+    """Returns (linked messages, distinct images) for reporting deduplication."""
+    messages, distinct = index.execute("SELECT COUNT(*), COUNT(DISTINCT sha256) FROM messages").fetchone()
+    return messages, distinct
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or populate the content-addressed media store.")
+    parser.add_argument('--import-legacy', action='store_true',
+                        help="Copy data/raw/images/<channel>/<message_id>.jpg files into the store.")
+    args = parser.parse_args()
+
+    store_index = open_index()
+    if args.import_legacy:
+        import_legacy(store_index)
+    messages, distinct = store_stats(store_index)
+    print(f"{messages} messages link to {distinct} distinct images in {MEDIA_STORE_DIR}")
+    store_index.close()
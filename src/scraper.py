@@ -1,10 +1,15 @@
 import os
+import gzip
+import zlib
 import json
 import logging
+import time
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
 from dotenv import load_dotenv
+from src import media_store, instrumentation
 
 # Load environment variables
 load_dotenv()
@@ -23,6 +28,80 @@ CHANNELS = [
 
 STATE_FILE = 'data/scraping_state.json'
 
+# Messages are appended as newline-delimited JSON to one rolling file per channel per day;
+# set SCRAPER_GZIP=1 to write <channel>.jsonl.gz instead of <channel>.jsonl.
+SCRAPER_GZIP = os.getenv('SCRAPER_GZIP', '0') == '1'
+# Flush the output and checkpoint last_id to STATE_FILE every N messages per channel
+SCRAPE_CHECKPOINT_EVERY = int(os.getenv('SCRAPE_CHECKPOINT_EVERY', '200'))
+
+# Concurrent photo downloads per channel, and how many messages a channel may fetch
+# per run (oldest first from last_id, so a capped run resumes where it stopped; 0 = no cap)
+SCRAPE_DOWNLOAD_WORKERS = int(os.getenv('SCRAPE_DOWNLOAD_WORKERS', '4'))
+SCRAPE_MESSAGE_BUDGET = int(os.getenv('SCRAPE_MESSAGE_BUDGET', '5000'))
+# Messages buffered between iteration, downloads and the writer
+SCRAPE_QUEUE_SIZE = int(os.getenv('SCRAPE_QUEUE_SIZE', '200'))
+
+def trim_partial_line(path):
+    """Drops a half-written last line left by a crash, so appended records start on a fresh line."""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        tail_start = max(size - (1 << 20), 0)
+        f.seek(tail_start)
+        tail = f.read()
+        f.truncate(tail_start + tail.rfind(b'\n') + 1)
+
+def repair_gzip(path):
+    """
+    Rewrites a gzip output whose last member was cut off by a crash, keeping every complete
+    line; appending a new member after a truncated one would make the rest unreadable.
+    """
+    try:
+        with gzip.open(path, 'rb') as f:
+            while f.read(1 << 20):
+                pass
+        return
+    except (EOFError, gzip.BadGzipFile, zlib.error):
+        pass
+    tmp_path = f"{path}.tmp"
+    kept = 0
+    with gzip.open(path, 'rb') as source, gzip.open(tmp_path, 'wb') as target:
+        try:
+            for line in source:
+                if line.endswith(b'\n'):
+                    target.write(line)
+                    kept += 1
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            pass
+    os.replace(tmp_path, path)
+    logging.warning(f"Recovered {kept} complete lines from truncated {path}")
+
+def open_output(json_dir, channel_name, replace=False):
+    """
+    Opens the day's output for appending; rerunning a day adds to it instead of overwriting
+    it, unless `replace` is set.
+    """
+    os.makedirs(json_dir, exist_ok=True)
+    if SCRAPER_GZIP:
+        # Each run appends a new gzip member; readers see one continuous stream
+        path = os.path.join(json_dir, f"{channel_name}.jsonl.gz")
+        if os.path.exists(path) and replace:
+            os.remove(path)
+        elif os.path.exists(path):
+            repair_gzip(path)
+        return path, gzip.open(path, 'at', encoding='utf-8')
+    path = os.path.join(json_dir, f"{channel_name}.jsonl")
+    if os.path.exists(path) and replace:
+        os.remove(path)
+    elif os.path.exists(path):
+        trim_partial_line(path)
+    return path, open(path, 'a', encoding='utf-8')
+
 def load_state():
     if os.path.exists(STATE_FILE):
         try:
@@ -33,75 +112,248 @@ def load_state():
     return {}
 
 def save_state(state):
+    """Writes the state to a temp file and renames it over STATE_FILE, so a crash never leaves it half-written."""
     os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
-    with open(STATE_FILE, 'w') as f:
+    tmp_path = f"{STATE_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(state, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, STATE_FILE)
 
 # Set up logging
+os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
     filename='logs/scraping.log',
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-async def scrape_channel(client, channel_username, last_id=0):
-    """Scrapes messages and images from a given Telegram channel."""
+class AdaptiveThrottle:
+    """
+    Paces Telegram requests shared by every channel on one client. A FloodWait pauses
+    all workers for the requested time and doubles the delay between requests;
+    each success shrinks the delay back towards zero.
+    """
+
+    def __init__(self, max_delay=10.0):
+        self.delay = 0.0
+        self.max_delay = max_delay
+        self.resume_at = 0.0
+        self.flood_waits = 0
+
+    async def wait(self):
+        pause = max(self.resume_at - time.monotonic(), 0.0) + self.delay
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+    def flood_wait(self, seconds):
+        self.flood_waits += 1
+        self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+        self.delay = min(max(self.delay * 2, 0.5), self.max_delay)
+        logging.warning(f"FloodWait of {seconds}s; request delay is now {self.delay:.2f}s")
+
+    def success(self):
+        self.delay = self.delay * 0.9 if self.delay > 0.01 else 0.0
+
+def message_record(message, channel_name):
+    return {
+        'message_id': message.id,
+        'channel_name': channel_name,
+        'message_date': message.date.isoformat(), 
+        'message_text': message.message or "",
+        'has_media': message.media is not None,
+        'views': message.views or 0,
+        'forwards': message.forwards or 0,
+    }
+
+async def scrape_channel(client, channel_username, last_id=0, throttle=None,
+                         download_workers=SCRAPE_DOWNLOAD_WORKERS, budget=SCRAPE_MESSAGE_BUDGET, media_index=None,
+                         state=None, checkpoint_every=SCRAPE_CHECKPOINT_EVERY, day=None):
+    """
+    Scrapes messages and images from a given Telegram channel.
+
+    Message iteration (oldest first from last_id, up to `budget` messages) feeds a bounded
+    pool of download workers; a writer emits records in message order as their photos
+    complete. Photos go to the content-addressed media store; a photo id already in the
+    store is linked without downloading it again. When a `state` dict is given, the output
+    is flushed and state[channel_username] checkpointed every `checkpoint_every` messages, so
+    a restart resumes after the last message on disk. Given a `day` (a date), only messages
+    posted that day (UTC) are fetched, replacing that day's output, as one date partition of
+    the Dagster pipeline. Returns (channel_username, new_last_id, stats).
+    """
     logging.info(f"Starting scraping for channel: {channel_username} (last_id: {last_id})")
+    metrics = instrumentation.start('scrape', channel=channel_username)
+    throttle = throttle or AdaptiveThrottle()
+    # The throttle may be shared by concurrent channels; count the FloodWaits during this one
+    flood_waits = throttle.flood_waits
+    stats = {'messages': 0, 'media': 0, 'reused': 0, 'bytes': 0, 'seconds': 0.0}
+    own_index = media_index is None
+    if own_index:
+        media_index = media_store.open_index()
+    start = time.perf_counter()
     
     try:
         entity = await client.get_entity(channel_username)
         channel_name = entity.username or entity.title
         
-        # Create folder for images
-        image_dir = f'data/raw/images/{channel_name}'
-        os.makedirs(image_dir, exist_ok=True)
-        
-        messages = []
-        new_last_id = last_id
-        
-        # iter_messages with min_id to only get newer messages
-        async for message in client.iter_messages(entity, min_id=last_id, limit=200):
-            if message.id > new_last_id:
-                new_last_id = message.id
-                
-            message_data = {
-                'message_id': message.id,
-                'channel_name': channel_name,
-                'message_date': message.date.isoformat(), 
-                'message_text': message.message or "",
-                'has_media': message.media is not None,
-                'views': message.views or 0,
-                'forwards': message.forwards or 0,
-            }
-            
-            # Download media if present
-            if message.photo:
-                image_path = os.path.join(image_dir, f"{message.id}.jpg")
-                await client.download_media(message.photo, file=image_path)
-                message_data['image_path'] = image_path
-                logging.info(f"Downloaded image for message {message.id} in {channel_name}")
-            
-            messages.append(message_data)
-        
-        # Store metadata in partitioned JSON
-        today = datetime.now().strftime('%Y-%m-%d')
-        json_dir = f'data/raw/telegram_messages/{today}'
-        os.makedirs(json_dir, exist_ok=True)
-        
-        json_path = os.path.join(json_dir, f"{channel_name}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(messages, f, indent=4, ensure_ascii=False)
-            
-        logging.info(f"Successfully scraped {len(messages)} messages from {channel_name}")
-        return channel_username, new_last_id
-        
+        # Store metadata in date-partitioned NDJSON, streamed as messages arrive
+        folder = (day or datetime.now()).strftime('%Y-%m-%d')
+        json_path, out = open_output(f'data/raw/telegram_messages/{folder}', channel_name, replace=day is not None)
     except Exception as e:
         logging.error(f"Error scraping {channel_username}: {str(e)}")
-        return channel_username, last_id
+        if own_index:
+            media_index.close()
+        metrics.fail()
+        metrics.finish()
+        return channel_username, last_id, stats
 
-async def main():
+    downloads = asyncio.Queue(maxsize=SCRAPE_QUEUE_SIZE)
+    # (record, download future or None) in message order, so output order never depends on download timing
+    pending = asyncio.Queue(maxsize=SCRAPE_QUEUE_SIZE)
+    new_last_id = last_id
+
+    window = {}
+    day_end = None
+    if day is not None:
+        day_start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        day_end = day_start + timedelta(days=1)
+        window['offset_date'] = day_start
+
+    async def produce():
+        offset = last_id
+        remaining = budget or None
+        while remaining is None or remaining > 0:
+            try:
+                await throttle.wait()
+                async for message in client.iter_messages(entity, min_id=offset, reverse=True, limit=remaining,
+                                                          **window):
+                    if day_end is not None and message.date >= day_end:
+                        break
+                    offset = message.id
+                    if remaining is not None:
+                        remaining -= 1
+                    future = None
+                    if message.photo:
+                        future = asyncio.get_running_loop().create_future()
+                        await downloads.put((message, future))
+                    await pending.put((message_record(message, channel_name), future))
+                throttle.success()
+                return
+            except FloodWaitError as e:
+                # Resume iteration after the last message already queued
+                throttle.flood_wait(e.seconds)
+
+    async def download():
+        while True:
+            item = await downloads.get()
+            if item is None:
+                return
+            message, future = item
+            image_path = None
+            try:
+                sha256 = media_store.lookup_photo(media_index, message.photo.id)
+                if sha256:
+                    stats['reused'] += 1
+                while sha256 is None:
+                    await throttle.wait()
+                    part_path = media_store.temp_path(f"{channel_name}_{message.id}")
+                    try:
+                        await client.download_media(message.photo, file=part_path)
+                        throttle.success()
+                        stats['bytes'] += os.path.getsize(part_path)
+                        sha256, is_new = media_store.add_file(media_index, part_path, message.photo.id)
+                        stats['media'] += 1
+                        if not is_new:
+                            stats['reused'] += 1
+                        logging.info(f"Downloaded image for message {message.id} in {channel_name}")
+                    except FloodWaitError as e:
+                        throttle.flood_wait(e.seconds)
+                    except Exception as e:
+                        logging.error(f"Failed to download image for message {message.id} in {channel_name}: {e}")
+                        if os.path.exists(part_path):
+                            os.remove(part_path)
+                        break
+                if sha256:
+                    media_store.link_message(media_index, channel_name, message.id, sha256)
+                    image_path = media_store.blob_path(sha256)
+            except Exception as e:
+                # A media store error: the writer skips this message instead of the worker dying
+                logging.error(f"Failed to store image for message {message.id} in {channel_name}: {e}")
+                future.set_exception(e)
+            finally:
+                # Always resolved, or the writer would wait on this message forever
+                if not future.done():
+                    future.set_result(image_path)
+
+    def checkpoint():
+        # Only messages that are on disk advance the checkpoint
+        out.flush()
+        os.fsync(out.fileno())
+        if state is not None and new_last_id > state.get(channel_username, 0):
+            state[channel_username] = new_last_id
+            save_state(state)
+
+    async def write():
+        nonlocal new_last_id
+        with out:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    checkpoint()
+                    return
+                message_data, future = item
+                if future is not None:
+                    try:
+                        image_path = await future
+                    except Exception:
+                        logging.warning(f"Skipping message {message_data['message_id']} in {channel_name}: "
+                                        f"its image could not be stored.")
+                        continue
+                    if image_path:
+                        message_data['image_path'] = image_path
+                out.write(json.dumps(message_data, ensure_ascii=False) + '\n')
+                new_last_id = max(new_last_id, message_data['message_id'])
+                stats['messages'] += 1
+                if checkpoint_every and stats['messages'] % checkpoint_every == 0:
+                    checkpoint()
+
+    workers = [asyncio.create_task(download()) for _ in range(max(1, download_workers))]
+    writer = asyncio.create_task(write())
+    try:
+        await produce()
+    except Exception as e:
+        # Everything already queued is still written, so state only advances past saved messages
+        logging.error(f"Error scraping {channel_username}: {str(e)}")
+        metrics.fail()
+    finally:
+        for _ in workers:
+            await downloads.put(None)
+        await asyncio.gather(*workers)
+        await pending.put(None)
+        await writer
+        if own_index:
+            media_index.close()
+
+    stats['seconds'] = time.perf_counter() - start
+    elapsed = stats['seconds'] or 1e-9
+    logging.info(
+        f"Successfully scraped {stats['messages']} messages ({stats['media']} images downloaded, "
+        f"{stats['reused']} already stored) from {channel_name} "
+        f"into {json_path} in {stats['seconds']:.1f}s: {stats['messages'] / elapsed:.1f} messages/sec, "
+        f"{stats['bytes'] / elapsed / 1e6:.2f} MB/sec"
+    )
+    metrics.add('messages', stats['messages'])
+    metrics.add('images_downloaded', stats['media'])
+    metrics.add('images_reused', stats['reused'])
+    metrics.add('bytes', stats['bytes'])
+    metrics.add('flood_waits', throttle.flood_waits - flood_waits)
+    metrics.finish()
+    return channel_username, new_last_id, stats
+
+def create_client():
     # Attempting another set of parameters to bypass RPC Error 406
-    async with TelegramClient(
+    return TelegramClient(
         'scraping_session', 
         API_ID, 
         API_HASH,
@@ -110,19 +362,38 @@ async def main():
         app_version='8.2.1',
         lang_code='en',
         system_lang_code='en-US'
-    ) as client:
+    )
+
+async def main():
+    async with create_client() as client:
         state = load_state()
+        throttle = AdaptiveThrottle()
+        media_index = media_store.open_index()
         tasks = []
         for channel in CHANNELS:
             last_id = state.get(channel, 0)
-            tasks.append(scrape_channel(client, channel, last_id))
+            tasks.append(scrape_channel(client, channel, last_id, throttle, media_index=media_index, state=state))
             
+        start = time.perf_counter()
         results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
         
         # Update and save state
-        for channel, nid in results:
+        for channel, nid, _ in results:
             state[channel] = nid
         save_state(state)
+        media_index.close()
+
+        messages = sum(stats['messages'] for _, _, stats in results)
+        megabytes = sum(stats['bytes'] for _, _, stats in results) / 1e6
+        reused = sum(stats['reused'] for _, _, stats in results)
+        summary = (
+            f"Scraped {messages} messages and {megabytes:.1f} MB of media in {elapsed:.1f}s "
+            f"({messages / elapsed:.1f} messages/sec, {megabytes / elapsed:.2f} MB/sec, "
+            f"{throttle.flood_waits} FloodWaits, {reused} images already stored)"
+        )
+        logging.info(summary)
+        print(summary)
 
 if __name__ == '__main__':
     if not API_ID or not API_HASH:
@@ -0,0 +1,48 @@
+import pytest
+
+class FakeCursor:
+    """
+    Stands in for a psycopg2 cursor: records each statement (whitespace collapsed) with its
+    parameters, and each fetchall() returns the next of `results` (then []).
+    """
+
+    def __init__(self, connection, results=()):
+        self.connection = connection
+        self.results = list(results)
+        self.statements = []
+        self.copied = None
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, vars=None):
+        self.statements.append((' '.join(query.split()), vars))
+
+    def fetchall(self):
+        return self.results.pop(0) if self.results else []
+
+    def copy_expert(self, sql, file):
+        self.statements.append((sql, None))
+        self.copied = file.read()
+
+class FakeConnection:
+    """Hands out one FakeCursor (`.cur`) and counts commits."""
+
+    def __init__(self, results=()):
+        self.cur = FakeCursor(self, results)
+        self.commits = 0
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+@pytest.fixture
+def fake_connection():
+    """Factory for FakeConnection; pass the fetchall() results the code under test will read."""
+    return FakeConnection
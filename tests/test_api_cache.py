@@ -0,0 +1,63 @@
+import asyncio
+from fastapi import Request, Response
+from api import cache
+from api.cache import MemoryCache, RedisCache
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    assert cache.get('a') == 1
+    cache.set('c', 3, ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set('a', 1, ttl=-1)
+    assert cache.get('a') is None
+
+def test_zero_ttl_means_no_expiry():
+    cache = MemoryCache()
+    cache.set('a', 1, ttl=0)
+    assert cache.get('a') == 1
+
+    class FakeRedis:
+        def __init__(self):
+            self.calls = []
+
+        def set(self, key, value):
+            self.calls.append(('set', key))
+
+        def setex(self, key, ttl, value):
+            if ttl <= 0:
+                raise ValueError("invalid expire time in 'setex' command")
+            self.calls.append(('setex', key, ttl))
+
+    redis_cache = RedisCache.__new__(RedisCache)
+    redis_cache.client = FakeRedis()
+    redis_cache.set('a', 1, ttl=0)
+    redis_cache.set('b', 2, ttl=60)
+    assert redis_cache.client.calls == [('set', 'api-cache:a'), ('setex', 'api-cache:b', 60)]
+
+def test_disabled_cache_computes_every_request(monkeypatch):
+    async def version(db):
+        return 1
+
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {'rows': len(calls)}
+
+    async def fetch_twice():
+        request = Request({'type': 'http', 'method': 'GET', 'path': '/api/reports/visual-content',
+                           'query_string': b'', 'headers': []})
+        return [await cache.cached_response(request, Response(), None, compute) for _ in range(2)]
+
+    monkeypatch.setattr(cache, 'pipeline_version', version)
+    monkeypatch.setattr(cache, 'backend', MemoryCache())
+    assert asyncio.run(fetch_twice()) == [{'rows': 1}, {'rows': 1}]
+    monkeypatch.setattr(cache, 'API_CACHE_ENABLED', False)
+    assert asyncio.run(fetch_twice()) == [{'rows': 2}, {'rows': 3}]
+    assert len(cache.backend.entries) == 1
@@ -0,0 +1,41 @@
+import os
+import argparse
+from benchmarks import generator, compare, run
+from src import load_data, media_store
+
+def test_generator_is_deterministic_and_loadable(tmp_path):
+    first = generator.generate(str(tmp_path / 'a'), channels=2, messages=50, days=3, seed=7)
+    second = generator.generate(str(tmp_path / 'b'), channels=2, messages=50, days=3, seed=7)
+    assert first == second
+    assert first['messages'] == 100 and 0 < first['distinct_images'] <= first['images']
+    assert generator.message_texts(5, seed=7) == generator.message_texts(5, seed=7)
+
+    files_a = load_data.list_message_files(str(tmp_path / 'a' / 'data' / 'raw' / 'telegram_messages'))
+    files_b = load_data.list_message_files(str(tmp_path / 'b' / 'data' / 'raw' / 'telegram_messages'))
+    assert [key for key, _ in files_a] == [key for key, _ in files_b]
+    for (_, path_a), (_, path_b) in zip(files_a, files_b):
+        assert open(path_a, 'rb').read() == open(path_b, 'rb').read()
+
+    rows = [row for _, path in files_a for row in load_data.iter_file_messages(path)]
+    assert len(rows) == 100
+    index = media_store.open_index(str(tmp_path / 'a' / 'data' / 'raw' / 'media'))
+    assert len(media_store.list_media(index, str(tmp_path / 'a' / 'data' / 'raw' / 'media'))) == first['images']
+    index.close()
+
+def test_compare_flags_regressions():
+    before = {'scenarios': [{'name': 'load_full', 'status': 'ok', 'seconds': 10.0},
+                            {'name': 'api_search_fts', 'status': 'ok', 'seconds': 1.0, 'p50_ms': 4.0}]}
+    after = {'scenarios': [{'name': 'load_full', 'status': 'ok', 'seconds': 5.0},
+                           {'name': 'api_search_fts', 'status': 'ok', 'seconds': 1.0, 'p50_ms': 6.0},
+                           {'name': 'yolo', 'status': 'skipped'}]}
+    verdicts = {row[0]: row[-1] for row in compare.compare(before, after)}
+    assert verdicts == {'load_full': 'faster', 'api_search_fts': 'slower', 'yolo': 'n/a'}
+
+def test_configure_environment_keeps_metrics_in_work_dir(tmp_path, monkeypatch):
+    names = ('DB_NAME', 'MEDIA_STORE_DIR', 'METRICS_FILE', 'METRICS_SNAPSHOT_FILE', 'PROMETHEUS_FILE',
+             'YOLO_MODEL', 'API_CACHE_ENABLED')
+    for name in names:
+        monkeypatch.setenv(name, 'unset')
+    run.configure_environment(argparse.Namespace(database='medical_bench', with_cache=False), str(tmp_path))
+    for name in ('METRICS_FILE', 'METRICS_SNAPSHOT_FILE', 'PROMETHEUS_FILE'):
+        assert os.environ[name].startswith(str(tmp_path / 'logs'))
@@ -0,0 +1,27 @@
+from src import db
+
+def test_execute_prepared_prepares_once_per_connection(monkeypatch, fake_connection):
+    monkeypatch.setattr(db, 'DB_PREPARED_STATEMENTS', True)
+    cur = fake_connection().cursor()
+    statement = f"INSERT INTO t (a, b) {db.unnest_select(('a', 'b'), {'a': 'INTEGER', 'b': 'TEXT'})}"
+    for batch in ([(1, 'x'), (2, None)], [(3, 'y')]):
+        db.execute_prepared(cur, 'insert_t', statement, db.text_arrays(batch, 2))
+
+    assert [query for query, _ in cur.statements] == [
+        "PREPARE insert_t AS INSERT INTO t (a, b) "
+        "SELECT a::INTEGER, b::TEXT FROM unnest($1::TEXT[], $2::TEXT[]) AS t(a, b)",
+        "EXECUTE insert_t (%s, %s)",
+        "EXECUTE insert_t (%s, %s)",
+    ]
+    assert cur.statements[1][1] == [['1', '2'], ['x', None]]
+
+    # A new connection prepares again; with prepared statements off the SQL runs directly
+    other = fake_connection().cursor()
+    monkeypatch.setattr(db, 'DB_PREPARED_STATEMENTS', False)
+    db.execute_prepared(other, 'insert_t', statement, [['4'], ['z']])
+    assert other.statements[0][0].endswith("FROM unnest(%s::TEXT[], %s::TEXT[]) AS t(a, b)")
+
+def test_database_url_quotes_credentials(monkeypatch):
+    monkeypatch.setattr(db, 'DB_USER', 'sa')
+    monkeypatch.setattr(db, 'DB_PASS', 'p@ss:word')
+    assert db.database_url('postgresql+asyncpg', 'medical_bench').startswith('postgresql+asyncpg://sa:p%40ss%3Aword@')
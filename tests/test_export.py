@@ -0,0 +1,48 @@
+import io
+import csv
+import json
+from datetime import date, datetime
+import pytest
+from api import export
+
+COLUMNS = [('id', 'int'), ('name', 'text'), ('seen_at', 'timestamp'), ('objects', 'json'), ('score', 'float')]
+ROWS = [
+    (1, 'Paracetamol, 500mg', datetime(2026, 1, 2, 3, 4, 5), '[{"class": "bottle"}]', 0.9),
+    (2, None, None, None, None),
+]
+
+def encode(encoder, chunks):
+    return b''.join(export.stream_body(iter(chunks), encoder))
+
+def test_ndjson_nests_json_columns():
+    body = encode(export.NdjsonEncoder(COLUMNS), [ROWS[:1], [], ROWS[1:]])
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+    assert lines == [
+        {'id': 1, 'name': 'Paracetamol, 500mg', 'seen_at': '2026-01-02T03:04:05',
+         'objects': [{'class': 'bottle'}], 'score': 0.9},
+        {'id': 2, 'name': None, 'seen_at': None, 'objects': None, 'score': None},
+    ]
+
+def test_csv_writes_header_once():
+    body = encode(export.CsvEncoder(COLUMNS), [ROWS[:1], ROWS[1:]])
+    rows = list(csv.reader(io.StringIO(body.decode())))
+    assert rows == [
+        ['id', 'name', 'seen_at', 'objects', 'score'],
+        ['1', 'Paracetamol, 500mg', '2026-01-02T03:04:05', '[{"class": "bottle"}]', '0.9'],
+        ['2', '', '', '', ''],
+    ]
+
+def test_arrow_stream_round_trips():
+    pa = pytest.importorskip('pyarrow')
+    body = encode(export.ArrowEncoder(COLUMNS), [ROWS[:1], ROWS[1:]])
+    table = pa.ipc.open_stream(body).read_all()
+    assert table.column_names == ['id', 'name', 'seen_at', 'objects', 'score']
+    assert table.column('id').to_pylist() == [1, 2]
+    assert table.column('seen_at').to_pylist() == [datetime(2026, 1, 2, 3, 4, 5), None]
+
+def test_export_query_filters():
+    query, params = export.export_query('messages', channel='chan1', date_from=date(2026, 1, 1), category='Other')
+    assert params == {'date_from': 20260101, 'channel': 'chan1', 'category': 'Other'}
+    assert 'ORDER BY t.message_pk' in str(query)
+    _, params = export.export_query('image-detections')
+    assert params == {}
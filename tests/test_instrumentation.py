@@ -0,0 +1,48 @@
+import pytest
+
+from src import instrumentation
+
+def test_stage_records_event_and_prometheus_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_FILE', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(instrumentation, 'SNAPSHOT_FILE', str(tmp_path / 'metrics_latest.json'))
+    monkeypatch.setattr(instrumentation, 'PROMETHEUS_FILE', str(tmp_path / 'metrics.prom'))
+
+    with instrumentation.stage('load') as metrics:
+        metrics.add('rows', 120)
+        metrics.add('rows', 30)
+        instrumentation.count_round_trip(3)
+    with pytest.raises(RuntimeError):
+        with instrumentation.stage('scrape', channel='CheMed123'):
+            raise RuntimeError("flood wait")
+
+    load, scrape = instrumentation.read_events()
+    assert load['status'] == 'ok' and load['counts'] == {'rows': 150} and load['db_round_trips'] == 3
+    assert scrape['status'] == 'error' and scrape['labels'] == {'channel': 'CheMed123'}
+    assert instrumentation.last_event('load') == load
+
+    prom = (tmp_path / 'metrics.prom').read_text()
+    assert 'medical_pipeline_stage_runs_total{stage="load",status="ok"} 1' in prom
+    assert 'medical_pipeline_stage_runs_total{channel="CheMed123",stage="scrape",status="error"} 1' in prom
+    assert 'medical_pipeline_stage_processed{stage="load",unit="rows"} 150' in prom
+    assert 'medical_pipeline_stage_db_round_trips{stage="load"} 3' in prom
+
+    with instrumentation.stage('load') as metrics:
+        metrics.add('rows', 7)
+    prom = (tmp_path / 'metrics.prom').read_text()
+    assert 'medical_pipeline_stage_runs_total{stage="load",status="ok"} 2' in prom
+    assert 'medical_pipeline_stage_processed{stage="load",unit="rows"} 7' in prom
+    assert prom == instrumentation.render_prometheus(instrumentation.read_snapshot())
+
+def test_history_is_rotated_but_snapshot_keeps_totals(tmp_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, 'METRICS_FILE', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(instrumentation, 'METRICS_MAX_BYTES', 1)
+    monkeypatch.setattr(instrumentation, 'SNAPSHOT_FILE', str(tmp_path / 'metrics_latest.json'))
+    monkeypatch.setattr(instrumentation, 'PROMETHEUS_FILE', str(tmp_path / 'metrics.prom'))
+
+    for _ in range(3):
+        instrumentation.start('dbt').finish()
+
+    assert len(instrumentation.read_events()) == 1
+    assert len(instrumentation.read_events(str(tmp_path / 'metrics.jsonl.1'))) == 1
+    (entry,) = instrumentation.read_snapshot().values()
+    assert entry['runs'] == {'ok': 3}
@@ -0,0 +1,117 @@
+import io
+import os
+import gzip
+import json
+import pytest
+from datetime import date, datetime
+from src.load_data import (iter_json_array, iter_file_messages, iter_batches, add_months, partition_name,
+                           copy_rows, file_hash, pending_files, _load_sequential, MESSAGE_COLUMNS)
+
+MESSAGES = [
+    {
+        'message_id': i,
+        'channel_name': 'CheMed123',
+        'message_date': '2026-01-17T10:00:00+00:00',
+        'message_text': f'ፓራሲታሞል {i}, "500mg" [price: {i * 10}]',
+        'has_media': i % 2 == 0,
+        'views': i * 100,
+        'forwards': i,
+    }
+    for i in range(25)
+]
+
+def test_iter_json_array_matches_json_load():
+    text = json.dumps(MESSAGES, indent=4, ensure_ascii=False)
+    for chunk_size in (1, 7, 64, 1 << 16):
+        assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == MESSAGES
+
+def test_iter_json_array_scalars_and_empty():
+    assert list(iter_json_array(io.StringIO('[12345, 6.5, "a,b"]'), chunk_size=2)) == [12345, 6.5, "a,b"]
+    assert list(iter_json_array(io.StringIO(' [ ] '))) == []
+
+def test_iter_file_messages_reads_all_formats(tmp_path):
+    expected = [tuple(m.get(col) for col in MESSAGE_COLUMNS) for m in MESSAGES]
+    lines = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in MESSAGES)
+
+    legacy = tmp_path / 'CheMed123.json'
+    legacy.write_text(json.dumps(MESSAGES, indent=4, ensure_ascii=False), encoding='utf-8')
+    ndjson = tmp_path / 'CheMed123.jsonl'
+    ndjson.write_text(lines, encoding='utf-8')
+    compressed = tmp_path / 'CheMed123.jsonl.gz'
+    with gzip.open(compressed, 'wt', encoding='utf-8') as f:
+        f.write(lines)
+
+    for path in (legacy, ndjson, compressed):
+        assert list(iter_file_messages(str(path))) == expected
+
+def test_iter_batches():
+    assert [len(b) for b in iter_batches(range(25), 10)] == [10, 10, 5]
+
+def test_monthly_partition_bounds():
+    assert add_months(date(2025, 12, 1), 1) == date(2026, 1, 1)
+    assert add_months(date(2026, 3, 1), -3) == date(2025, 12, 1)
+    assert partition_name(datetime(2026, 1, 17, 10, 0)) == 'raw.telegram_messages_y2026m01'
+
+def test_iter_json_array_rejects_truncated_input():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"message_id": 1}, {"message_id": 2}'), chunk_size=4))
+
+def test_copy_rows_keeps_nulls_empty_strings_and_line_breaks(fake_connection):
+    cur = fake_connection().cursor()
+    rows = [
+        (1, 'CheMed123', None, '', True, None, 0, None),
+        (2, 'CheMed123', '2026-01-17T10:00:00', 'line 1\nline 2\ttab \\N "quoted"', False, 'a\\b.jpg', 5, 1),
+    ]
+    copy_rows(cur, rows, table='raw.t', columns=MESSAGE_COLUMNS)
+
+    assert cur.statements[0][0] == f"COPY raw.t ({', '.join(MESSAGE_COLUMNS)}) FROM STDIN"
+    assert cur.copied.split('\n') == [
+        '1\tCheMed123\t\\N\t\tTrue\t\\N\t0\t\\N',
+        '2\tCheMed123\t2026-01-17T10:00:00\tline 1\\nline 2\\ttab \\\\N "quoted"\tFalse\ta\\\\b.jpg\t5\t1',
+        '',
+    ]
+
+def write_files(tmp_path, contents):
+    files = []
+    for name, text in contents.items():
+        path = tmp_path / name
+        path.write_text(text, encoding='utf-8')
+        files.append((f"2026-01-17/{name}", str(path)))
+    return files
+
+def test_pending_files_compares_size_and_mtime(tmp_path, fake_connection):
+    files = write_files(tmp_path, {'a.jsonl': '{"message_id": 1}\n', 'b.jsonl': '{"message_id": 2}\n', 'c.jsonl': ''})
+    stats = [os.stat(path) for _, path in files]
+    manifest = [
+        ('2026-01-17/a.jsonl', stats[0].st_size, stats[0].st_mtime, 'hash-a'),      # unchanged
+        ('2026-01-17/b.jsonl', stats[1].st_size, stats[1].st_mtime - 60, 'hash-b'),  # touched
+    ]
+
+    pending = pending_files(fake_connection([manifest]).cursor(), files, full_refresh=False)
+    assert [(entry[0], entry[1], entry[5]) for entry in pending] == [
+        (1, '2026-01-17/b.jsonl', 'hash-b'),
+        (2, '2026-01-17/c.jsonl', None),
+    ]
+
+    cur = fake_connection([manifest]).cursor()
+    assert [entry[1] for entry in pending_files(cur, files, full_refresh=True)] == [key for key, _ in files]
+    assert cur.statements == []  # a full refresh doesn't read the manifest
+
+def test_load_sequential_reloads_only_changed_content(tmp_path, fake_connection):
+    files = write_files(tmp_path, {'same.jsonl': '{"message_id": 1}\n', 'changed.jsonl': '{"message_id": 2}\n'})
+    pending = [
+        (rank, key, path, os.path.getsize(path), 0.0, known)
+        for rank, ((key, path), known) in enumerate(zip(files, [file_hash(files[0][1]), 'stale-hash']))
+    ]
+    conn = fake_connection()
+    cur = conn.cursor()
+
+    assert _load_sequential(conn, pending, 'run-1', batch_size=10, method='copy') == (1, 0, 1)
+    copies = [sql for sql, _ in cur.statements if sql.startswith('COPY')]
+    assert len(copies) == 1 and cur.copied.startswith('2\t')
+    manifest_rows = [vars for sql, vars in cur.statements if 'raw.load_manifest' in sql]
+    assert [(row[0], row[4]) for row in manifest_rows] == [
+        ('2026-01-17/same.jsonl', None),    # hash matched: only size/mtime refreshed
+        ('2026-01-17/changed.jsonl', 1),
+    ]
+    assert conn.commits == 2
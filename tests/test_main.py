@@ -1,5 +1,7 @@
 from api.main import app
+from api.database import get_db
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import DBAPIError
 
 client = TestClient(app)
 
@@ -7,3 +9,52 @@ def test_read_main():
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Welcome to the Medical Telegram Warehouse API"}
+
+class DatabaseError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(f"SQLSTATE {pgcode}")
+        self.pgcode = pgcode
+
+class FailingSession:
+    def __init__(self, pgcode):
+        self.pgcode = pgcode
+
+    def execute(self, query, params=None):
+        raise DBAPIError("SELECT ...", params, DatabaseError(self.pgcode))
+
+def search_status(mode, pgcode):
+    app.dependency_overrides[get_db] = lambda: FailingSession(pgcode)
+    try:
+        return client.get("/api/search/messages", params={"query": "paracetamol", "mode": mode}).status_code
+    finally:
+        app.dependency_overrides.clear()
+
+def test_fuzzy_search_maps_only_missing_pg_trgm_to_501():
+    assert search_status("fuzzy", "42883") == 501  # undefined_function: no pg_trgm
+    assert search_status("fuzzy", "57014") == 500  # query_canceled (statement timeout)
+    assert search_status("fts", "42883") == 500
+
+class RowsSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+def search(rows, **params):
+    app.dependency_overrides[get_db] = lambda: RowsSession(rows)
+    try:
+        return client.get("/api/search/messages", params={"query": "paracetamol", **params})
+    finally:
+        app.dependency_overrides.clear()
+
+def test_search_flags_results_cut_off_by_the_candidate_cap():
+    row = (7, "2026-01-17T10:00:00", "CheMed123", "paracetamol 500mg", 120, 0.5)
+    response = search([row + (True,)])
+    assert response.json()[0]["id"] == 7 and response.headers["X-Search-Truncated"] == "true"
+    response = search([(None,) * 6 + (True,)], after_rank=0.1, after_id=3)
+    assert response.json() == [] and response.headers["X-Search-Truncated"] == "true"
+    assert "X-Search-Truncated" not in search([row + (False,)]).headers
@@ -0,0 +1,22 @@
+from datetime import date
+
+from orchestration import defs, assets
+
+def test_definitions_load():
+    graph = defs.resolve_asset_graph()
+    assert {key.to_user_string() for key in graph.get_all_asset_keys()} == {
+        'raw_message_files', 'raw_messages', 'image_detections', 'dbt_marts'
+    }
+    assert defs.resolve_schedule_def('daily_schedule').job_name == 'ingestion_job'
+
+def test_partition_files_matches_channel_case_insensitively(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets.load_data, 'BASE_DIR', str(tmp_path))
+    (tmp_path / '2026-01-02').mkdir()
+    for name in ('chemed123.jsonl', 'CheMed123.jsonl.gz', 'tikvahpharma.jsonl', 'notes.txt'):
+        (tmp_path / '2026-01-02' / name).write_text('')
+    (tmp_path / '2026-01-03').mkdir()
+    (tmp_path / '2026-01-03' / 'CheMed123.jsonl').write_text('')
+
+    assert assets.partition_files(date(2026, 1, 2), 'CheMed123') == {
+        '2026-01-02/chemed123.jsonl', '2026-01-02/CheMed123.jsonl.gz'
+    }
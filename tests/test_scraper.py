@@ -0,0 +1,118 @@
+import json
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from src import scraper, media_store
+
+class FakeClient:
+    def __init__(self, count, photos=None):
+        # message id -> (Telegram photo id, file contents)
+        photos = photos or {i: (i, f'photo {i}'.encode()) for i in range(1, count + 1, 2)}
+        self.messages = [
+            SimpleNamespace(id=i, date=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(hours=6 * i), message=f"m{i}", media=None,
+                            photo=SimpleNamespace(id=photos[i][0], data=photos[i][1]) if i in photos else None,
+                            views=0, forwards=0)
+            for i in range(1, count + 1)
+        ]
+        self.downloads = 0
+
+    async def get_entity(self, username):
+        return SimpleNamespace(username=username, title=username)
+
+    async def iter_messages(self, entity, min_id=0, reverse=False, limit=None, offset_date=None):
+        messages = [m for m in self.messages if m.id > min_id and (offset_date is None or m.date >= offset_date)]
+        for message in messages[:limit]:
+            if message.id == getattr(self, 'fail_at', None):
+                raise ConnectionError("connection lost")
+            yield message
+
+    async def download_media(self, photo, file):
+        # Later photos finish first, so the writer has to restore message order
+        self.downloads += 1
+        await asyncio.sleep(0.01 * (20 - photo.id % 20) / 20)
+        with open(file, 'wb') as f:
+            f.write(photo.data)
+
+def test_scrape_channel_budget_and_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(20)
+    _, last_id, stats = asyncio.run(scraper.scrape_channel(client, 'chan', 5, download_workers=4, budget=10))
+    assert last_id == 15
+    assert stats['messages'] == 10 and stats['media'] == 5
+
+    path = next((tmp_path / 'data/raw/telegram_messages').glob('*/chan.jsonl'))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r['message_id'] for r in records] == list(range(6, 16))
+    assert all(('image_path' in r) == (r['message_id'] % 2 == 1) for r in records)
+
+def test_scrape_channel_reuses_stored_photos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Messages 1-3 repost photo 100; message 4 is a new upload with the same bytes as photo 100
+    client = FakeClient(4, photos={1: (100, b'pill'), 2: (100, b'pill'), 3: (100, b'pill'), 4: (200, b'pill')})
+
+    _, _, stats = asyncio.run(scraper.scrape_channel(client, 'chan', 0, download_workers=1, budget=0))
+    assert client.downloads == 2 and stats['reused'] == 3
+
+    index = media_store.open_index()
+    media = media_store.list_media(index)
+    assert len(media) == 4 and len({row[3] for row in media}) == 1
+    assert media_store.store_stats(index) == (4, 1)
+    index.close()
+
+def test_scrape_channel_checkpoints_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(20)
+    client.fail_at = 8
+    state = {}
+    asyncio.run(scraper.scrape_channel(client, 'chan', 0, budget=0, state=state, checkpoint_every=3))
+    assert scraper.load_state() == {'chan': 7}
+
+    client.fail_at = None
+    downloads = client.downloads
+    asyncio.run(scraper.scrape_channel(client, 'chan', state['chan'], budget=0, state=state, checkpoint_every=3))
+    assert scraper.load_state() == {'chan': 20}
+    # Photos of messages 1-7 were stored before the failure and are not fetched again
+    assert client.downloads - downloads == 6
+
+    path = next((tmp_path / 'data/raw/telegram_messages').glob('*/chan.jsonl'))
+    assert [json.loads(line)['message_id'] for line in path.read_text().splitlines()] == list(range(1, 21))
+
+def test_scrape_channel_day_partition(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = FakeClient(20)
+    for _ in range(2):
+        # Rerunning a day replaces its output
+        _, _, stats = asyncio.run(scraper.scrape_channel(client, 'chan', budget=0, day=date(2026, 1, 2)))
+    assert stats['messages'] == 4
+
+    path = tmp_path / 'data/raw/telegram_messages/2026-01-02/chan.jsonl'
+    assert [json.loads(line)['message_id'] for line in path.read_text().splitlines()] == [4, 5, 6, 7]
+
+def test_scrape_channel_skips_message_when_media_store_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    link_message = media_store.link_message
+
+    def failing_link(index, channel, message_id, sha256):
+        if message_id == 3:
+            raise OSError("disk full")
+        link_message(index, channel, message_id, sha256)
+
+    monkeypatch.setattr(media_store, 'link_message', failing_link)
+    client = FakeClient(6)
+    # Would hang on message 3's download future if the failure left it unresolved
+    _, last_id, stats = asyncio.run(asyncio.wait_for(
+        scraper.scrape_channel(client, 'chan', 0, download_workers=2, budget=0), timeout=10))
+    assert last_id == 6 and stats['messages'] == 5
+
+    path = next((tmp_path / 'data/raw/telegram_messages').glob('*/chan.jsonl'))
+    assert [json.loads(line)['message_id'] for line in path.read_text().splitlines()] == [1, 2, 4, 5, 6]
+
+def test_throttle_backs_off_and_recovers():
+    throttle = scraper.AdaptiveThrottle(max_delay=2)
+    for _ in range(5):
+        throttle.flood_wait(0)
+    assert throttle.delay == 2 and throttle.flood_waits == 5
+    for _ in range(100):
+        throttle.success()
+    assert throttle.delay == 0
@@ -0,0 +1,104 @@
+import json
+import numpy as np
+import pandas as pd
+from src import db, yolo_detect
+from src.yolo_detect import (categorize_image, summarize_result, write_detections, export_csv_chunk,
+                             DETECTION_COLUMNS)
+
+def test_categorize_image():
+    assert categorize_image(['person', 'bottle']) == 'Promotional'
+    assert categorize_image(['bottle', 'cup', 'bottle']) == 'Product Display'
+    assert categorize_image(['person']) == 'Lifestyle'
+    assert categorize_image(['car']) == 'Other'
+    assert categorize_image([]) == 'Other'
+
+def test_write_detections_dedups_and_writes_chunk_in_three_statements(monkeypatch, fake_connection):
+    monkeypatch.setattr(db, 'DB_PREPARED_STATEMENTS', False)
+    bottle = {'class': 'bottle', 'conf': 0.9, 'bbox': [1.0, 2.0, 3.5, 4.0]}
+    person = {'class': 'person', 'conf': 0.6, 'bbox': [0.0, 0.0, 10.0, 20.0]}
+    rows = [
+        ('CheMed123', 1, 'old.jpg', 'h1', 'bottle', 0.9, [bottle], 'Product Display'),
+        ('CheMed123', 2, 'b.jpg', 'h2', 'None', 0.0, [], 'Other'),
+        ('CheMed123', 1, 'new.jpg', 'h1', 'bottle', 0.9, [bottle, person], 'Promotional'),
+    ]
+    conn = fake_connection([[(10, 'CheMed123', '1'), (11, 'CheMed123', '2')]])
+    cur = conn.cursor()
+
+    write_detections(conn, rows, 'yolov8n.pt:abc')
+
+    (upsert, upsert_params), (delete, delete_params), (insert, insert_params) = cur.statements
+    assert upsert.startswith('INSERT INTO raw.yolo_detections') and 'ON CONFLICT (channel_name, message_id)' in upsert
+    columns = dict(zip(DETECTION_COLUMNS, upsert_params))
+    assert columns['message_id'] == ['1', '2']  # the later copy of message 1 wins
+    assert columns['image_path'] == ['new.jpg', 'b.jpg']
+    assert [json.loads(value) for value in columns['detected_objects']] == [[bottle, person], []]
+    assert columns['model_version'] == ['yolov8n.pt:abc'] * 2
+    assert delete.startswith('DELETE FROM raw.yolo_detection_objects') and delete_params == ([10, 11],)
+    assert insert.startswith('INSERT INTO raw.yolo_detection_objects')
+    assert insert_params == [['10', '10'], ['0', '1'], ['bottle', 'person'], ['0.9', '0.6'],
+                             ['{1.0,2.0,3.5,4.0}', '{0.0,0.0,10.0,20.0}']]
+    assert conn.commits == 1
+
+class FakeTensor:
+    def __init__(self, values):
+        self.values = np.array(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+class FakeBoxes:
+    def __init__(self, cls, conf, xyxy):
+        self.cls, self.conf, self.xyxy = FakeTensor(cls), FakeTensor(conf), FakeTensor(xyxy)
+
+    def __len__(self):
+        return len(self.cls.values)
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+def test_summarize_result_shapes_jsonb_objects():
+    class_names = np.array(['person', 'bottle', 'cup'], dtype=object)
+    boxes = FakeBoxes([1.0, 0.0], [0.41234567, 0.87654321], [[1.04, 2.06, 3.0, 4.0], [5.0, 6.0, 7.0, 8.0]])
+
+    primary_class, confidence, objects, category = summarize_result(FakeResult(boxes), class_names)
+
+    assert (primary_class, round(confidence, 4), category) == ('person', 0.8765, 'Promotional')
+    assert objects == [
+        {'class': 'bottle', 'conf': 0.4123, 'bbox': [1.0, 2.1, 3.0, 4.0]},
+        {'class': 'person', 'conf': 0.8765, 'bbox': [5.0, 6.0, 7.0, 8.0]},
+    ]
+    assert json.loads(json.dumps(objects)) == objects
+    assert summarize_result(FakeResult(FakeBoxes([], [], [])), class_names) == ('None', 0.0, [], 'Other')
+    assert summarize_result(FakeResult(None), class_names) == ('None', 0.0, [], 'Other')
+
+def test_export_csv_chunk_writes_one_header(tmp_path):
+    csv_path = str(tmp_path / 'detections.csv')
+    row = ('CheMed123', 1, 'a.jpg', 'h1', 'bottle', 0.9, [], 'Product Display')
+    export_csv_chunk([row], csv_path, append=True)  # a missing file still gets its header
+    export_csv_chunk([row], csv_path, append=True)
+    assert len(pd.read_csv(csv_path)) == 2
+    export_csv_chunk([row], csv_path, append=False)
+    assert len(pd.read_csv(csv_path)) == 1
+
+def test_list_all_images_hashes_only_requested_images(tmp_path, monkeypatch):
+    for channel in ('CheMed123', 'tikvahpharma'):
+        (tmp_path / channel).mkdir()
+        for message_id in (1, 2):
+            (tmp_path / channel / f'{message_id}.jpg').write_bytes(b'jpeg')
+    hashed = []
+    monkeypatch.setattr(yolo_detect, 'file_hash', lambda path: hashed.append(path) or 'h')
+
+    images = yolo_detect.list_all_images(str(tmp_path), media_root=str(tmp_path / 'media'),
+                                         only={('CheMed123', '2')})
+    assert [(channel, message_id) for channel, message_id, _, _ in images] == [('CheMed123', '2')]
+    assert hashed == [str(tmp_path / 'CheMed123' / '2.jpg')]
+
+def test_list_images_skips_non_numeric_names(tmp_path):
+    (tmp_path / 'CheMed123').mkdir()
+    for name in ('7.jpg', 'cover.jpg', '7 (1).jpg'):
+        (tmp_path / 'CheMed123' / name).write_bytes(b'jpeg')
+    assert [image[1] for image in yolo_detect.list_images(str(tmp_path))] == ['7']